@@ -1,153 +1,34 @@
 import pandas as pd
 import os
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from io import StringIO
-import time
-
-# Dictionary of URLs and their identifiers
-links = {
-    "https://fbref.com/en/comps/9/stats/Premier-League-Stats": "stats_standard",
-    "https://fbref.com/en/comps/9/keepers/Premier-League-Stats": "stats_keeper",
-    "https://fbref.com/en/comps/9/shooting/Premier-League-Stats": "stats_shooting",
-    "https://fbref.com/en/comps/9/passing/Premier-League-Stats": "stats_passing",
-    "https://fbref.com/en/comps/9/gca/Premier-League-Stats": "stats_gca",
-    "https://fbref.com/en/comps/9/defense/Premier-League-Stats": "stats_defense",
-    "https://fbref.com/en/comps/9/possession/Premier-League-Stats": "stats_possession",
-    "https://fbref.com/en/comps/9/misc/Premier-League-Stats": "stats_misc"
-}
-
-# Set up Selenium options
-chrome_options = Options()
-chrome_options.add_argument("--headless")
-chrome_options.add_argument("--disable-gpu")
-chrome_options.add_argument("--window-size=1920x1080")
-chrome_options.add_argument(
-    "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-
-# Initialize the WebDriver
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=chrome_options)
-
-
-def scrape_table_with_selenium(url, table_id):
-    try:
-        print(f"Scraping {url}...")
-        driver.get(url)
-        time.sleep(5)  # Increased wait time
-
-        # Wait for table to load
-        table = driver.find_element(By.ID, table_id)
-        html = table.get_attribute('outerHTML')
-
-        # Use StringIO to avoid the FutureWarning
-        df = pd.read_html(StringIO(html))[0]
-
-        # Clean multi-index columns
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = ['_'.join(col).strip() for col in df.columns.values]
-
-        # Standardize column names
-        df.columns = df.columns.str.replace(r'%', 'pct', regex=True)
-        df.columns = df.columns.str.replace(r'[^a-zA-Z0-9_]', '_', regex=True)
-
-        return df
-
-    except Exception as e:
-        print(f"Error scraping {url}: {str(e)}")
-        return None
-
-
-# Initialize the main DataFrame with the standard stats
-main_df = scrape_table_with_selenium(
-    "https://fbref.com/en/comps/9/stats/Premier-League-Stats",
-    "stats_standard"
-)
-
-if main_df is None:
-    raise Exception("Failed to scrape the initial standard stats table")
-
-# Check for player column (might be 'Player' or 'player')
-player_col = next((col for col in main_df.columns if 'player' in col.lower()), None)
-if not player_col:
-    raise Exception("Could not find player column in the data")
-
-# Rename player column to standard 'Player'
-main_df = main_df.rename(columns={player_col: 'Player'})
-
-# Clean player names
-main_df['Player'] = main_df['Player'].str.replace(r'^\d+\s*', '', regex=True).str.strip()
-
-# Find minutes column (might be 'Min', 'Minutes', etc.)
-minutes_col = next((col for col in main_df.columns if 'min' in col.lower()), None)
-if minutes_col:
-    # Convert minutes to numeric, coerce errors
-    main_df[minutes_col] = pd.to_numeric(main_df[minutes_col], errors='coerce')
-    main_df = main_df[main_df[minutes_col] > 90]
-    # Rename to standard 'Minutes'
-    main_df = main_df.rename(columns={minutes_col: 'Minutes'})
-else:
-    print("Warning: Could not find minutes column, skipping minutes filter")
-
-# Find squad column (might be 'Squad', 'Team', etc.)
-squad_col = next((col for col in main_df.columns if 'squad' in col.lower() or 'team' in col.lower()), None)
-if squad_col and squad_col != 'Squad':
-    main_df = main_df.rename(columns={squad_col: 'Squad'})
-
-# Iterate through other links and merge them
-for url, table_id in links.items():
-    if table_id == "stats_standard":  # We already have this
-        continue
-
-    try:
-        df = scrape_table_with_selenium(url, table_id)
-        if df is None:
-            continue
-
-        # Find and standardize player column
-        player_col = next((col for col in df.columns if 'player' in col.lower()), None)
-        if not player_col:
-            print(f"Skipping {table_id} - no player column found")
-            continue
-
-        df = df.rename(columns={player_col: 'Player'})
-        df['Player'] = df['Player'].str.replace(r'^\d+\s*', '', regex=True).str.strip()
-
-        # Find and standardize squad column if available
-        squad_col = next((col for col in df.columns if 'squad' in col.lower() or 'team' in col.lower()), None)
-        merge_cols = ['Player']
-        if squad_col:
-            df = df.rename(columns={squad_col: 'Squad'})
-            merge_cols.append('Squad')
-
-        # Merge with main DataFrame
-        main_df = pd.merge(
-            main_df,
-            df,
-            on=merge_cols,
-            how='left',
-            suffixes=('', '_drop')
-        )
-
-        # Drop duplicate columns
-        main_df = main_df.loc[:, ~main_df.columns.str.endswith('_drop')]
-
-    except Exception as e:
-        print(f"Error processing {table_id}: {str(e)}")
-        continue
-    
-
-# Close the browser
-driver.quit()
-
-# Final cleaning and sorting
-main_df = main_df.sort_values('Player').reset_index(drop=True)
-
-# Remove duplicate columns
-main_df = main_df.loc[:, ~main_df.columns.duplicated()]
+from fbref_tables import COMPETITIONS, TABLE_TYPES, join_tables
+from player_data import write_results_store
+from player_registry import PlayerRegistry
+from scrape_scheduler import build_targets, run_targets
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Scraper settings. Point FBREF_BASE_URL at a local server (see scraping.serve_recorded_pages)
+# to run offline against recorded pages.
+BASE_URL = os.environ.get("FBREF_BASE_URL", "https://fbref.com").rstrip('/')
+RECORD_DIR = os.environ.get("FBREF_RECORD_DIR")
+MAX_CONCURRENCY = int(os.environ.get("FBREF_MAX_CONCURRENCY", "4"))  # worker processes, 1 = sequential
+REQUESTS_PER_SECOND = float(os.environ.get("FBREF_REQUESTS_PER_SECOND", "1"))  # per host, shared by all workers
+RETRIES = int(os.environ.get("FBREF_RETRIES", "3"))
+PAGE_TIMEOUT = 20  # seconds to wait for a table to appear
+
+# Leagues (fbref competition ids, see fbref_tables.COMPETITIONS) and seasons to scrape, "current" is
+# the running season. For example FBREF_COMPETITIONS=9,12,11,20,13 FBREF_SEASONS=2022-2023,2023-2024
+SCRAPE_COMPETITIONS = [int(c) for c in os.environ.get("FBREF_COMPETITIONS", "9").split(',')]
+SCRAPE_SEASONS = [None if s.strip() in ('', 'current') else s.strip()
+                  for s in os.environ.get("FBREF_SEASONS", "current").split(',')]
+
+# Every league-season is written to its own partition; the current Premier League season
+# also goes to results.csv, the input of the later problems
+PARTITION_DIR = os.path.join(BASE_DIR, 'partitions')
+PRIMARY_PARTITION = (9, None)
+
+# Stable player IDs stamped on every partition
+registry = PlayerRegistry()
 
 # Define the columns to keep based on the provided list
 columns_to_keep = [
@@ -197,31 +78,6 @@ columns_to_keep = [
     'Aerial_Duels_Won', 'Aerial_Duels_Lost', 'Aerial_Duels_Wonpct'
 ]
 
-# Standardize column names to avoid issues with special characters
-def standardize_column_names(df):
-    df.columns = df.columns.str.replace(r'%', 'pct', regex=True)
-    df.columns = df.columns.str.replace(r'[^a-zA-Z0-9_]', '_', regex=True)
-    df.columns = df.columns.str.replace(r'_+', '_', regex=True)
-    df.columns = df.columns.str.strip('_')
-    return df
-
-# Standardize column names in the main DataFrame
-main_df = standardize_column_names(main_df)
-
-# Find available columns in the main DataFrame
-available_columns = [col for col in columns_to_keep if col in main_df.columns]
-
-# Filter to keep only the necessary columns
-filtered_df = main_df[available_columns]
-
-# Rearrange the column order according to the given list
-ordered_columns = []
-for col in columns_to_keep:
-    if col in filtered_df.columns:
-        ordered_columns.append(col)
-
-filtered_df = filtered_df[ordered_columns]
-
 # Rename columns to more user-friendly names
 column_rename_map = {
     'Playing_Time_MP': 'Matches',
@@ -284,14 +140,85 @@ column_rename_map = {
  
 }
 
-filtered_df = filtered_df.rename(columns=column_rename_map)
-filtered_df['Nation']= filtered_df['Nation'].str.split(' ').str[-1]
-filtered_df = filtered_df.fillna("N/a")
 
+def build_results(tables):
+    """Turn the prepared tables of one league-season into the final dataset"""
+    # Initialize the main DataFrame with the standard stats
+    main_df = tables.get('stats')
+    if main_df is None:
+        raise Exception("Failed to scrape the initial standard stats table")
+
+    # Find minutes column (might be 'Min', 'Minutes', etc.)
+    minutes_col = next((col for col in main_df.columns if 'min' in col.lower()), None)
+    if minutes_col:
+        # Convert minutes to numeric, coerce errors
+        main_df[minutes_col] = pd.to_numeric(main_df[minutes_col], errors='coerce')
+        main_df = main_df[main_df[minutes_col] > 90]
+        # Rename to standard 'Minutes'
+        main_df = main_df.rename(columns={minutes_col: 'Minutes'})
+    else:
+        print("Warning: Could not find minutes column, skipping minutes filter")
+
+    # Join every other table onto the standard stats in a single pass, in page order
+    other_tables = [tables[table_type] for table_type in TABLE_TYPES
+                    if table_type != 'stats' and tables.get(table_type) is not None]
+    filtered_df = join_tables(main_df, other_tables, columns_to_keep)
+
+    # Final cleaning and sorting
+    filtered_df = filtered_df.sort_values('Player').reset_index(drop=True)
+
+    # Arrange the columns in the order of the list
+    filtered_df = filtered_df[[col for col in columns_to_keep if col in filtered_df.columns]]
 
-# Save to CSV
-output_file = os.path.join(os.path.dirname(__file__), 'results.csv')
-filtered_df.to_csv(output_file, index=False, encoding='utf-8')
-print(f"\nSuccess! Data saved to {output_file}")
-print("\nColumns in final dataset:")
-print(filtered_df.columns.tolist())
+    filtered_df = filtered_df.rename(columns=column_rename_map)
+    filtered_df['Nation'] = filtered_df['Nation'].str.split(' ').str[-1]
+    filtered_df = filtered_df.fillna("N/a")
+    return filtered_df
+
+
+def partition_path(competition, season):
+    return os.path.join(PARTITION_DIR, COMPETITIONS[competition], season or 'current', 'results.csv')
+
+
+def save_partition(competition, season, tables):
+    label = f"{COMPETITIONS[competition]} {season or 'current season'}"
+    try:
+        filtered_df = build_results(tables)
+    except Exception as e:
+        print(f"Error building {label}: {str(e)}")
+        return
+
+    filtered_df = registry.stamp(filtered_df, source='fbref')
+    registry.save()
+
+    output_files = [partition_path(competition, season)]
+    if (competition, season) == PRIMARY_PARTITION:
+        output_files.append(os.path.join(BASE_DIR, 'results.csv'))
+
+    # Save to CSV
+    for output_file in output_files:
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        filtered_df.to_csv(output_file, index=False, encoding='utf-8')
+        # Typed columnar copy for the analysis stages (see player_data.load_results)
+        write_results_store(filtered_df, output_file)
+        print(f"\nSuccess! {label} saved to {output_file}")
+    print("\nColumns in final dataset:")
+    print(filtered_df.columns.tolist())
+
+
+if __name__ == "__main__":
+    targets = build_targets(SCRAPE_COMPETITIONS, SCRAPE_SEASONS)
+    print(f"Scraping {len(targets)} tables with {MAX_CONCURRENCY} workers...")
+    run_targets(
+        targets,
+        save_partition,
+        settings={
+            'base_url': BASE_URL,
+            'record_dir': RECORD_DIR,
+            'page_timeout': PAGE_TIMEOUT,
+            'retries': RETRIES,
+            'columns_to_keep': columns_to_keep,
+        },
+        workers=MAX_CONCURRENCY,
+        requests_per_second=REQUESTS_PER_SECOND
+    )
@@ -1,74 +1,48 @@
-import pandas as pd
-import numpy as np
 import os
+import pandas as pd
+from player_data import load_player_matrix
+from leaderboard import leaderboards, write_leaderboard
+from rank_index import load_rank_index
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 csv_path = os.path.join(BASE_DIR, "results.csv")
 output_path = os.path.join(BASE_DIR, "top_3.txt")
 
-# Read the data from CSV file
-df = pd.read_csv(csv_path)
-
-
-
-# Function to convert age string to numerical value
-def convert_age(age_str):
-    # Return NaN if the value is missing or 'N/a'
-    if pd.isna(age_str) or age_str == "N/a":
-        return np.nan
-    try:
-        # Handle cases where age isn't in year-day format
-        if '-' not in str(age_str):
-            return float(age_str)
-        # Split into years and days, then convert to decimal years
-        years, days = map(int, str(age_str).split('-'))
-        return round(years + days / 365, 2)
-    except:
-        # Return NaN if conversion fails
-        return np.nan
-
+# Number of players per list, and optionally 'Squad' or 'Position' for one board per group
+TOP_K = 3
+GROUP_BY = None
+# RANK_PLAYER=<name or Player_ID> also brings the per-stat rank index up to date (only the
+# stats that changed are re-ranked) and prints where that player ranks in every statistic,
+# once for every squad they played for
+RANK_PLAYER = os.environ.get("RANK_PLAYER")
 
-# Apply age conversion to the Age column
-df['Age'] = df['Age'].apply(convert_age)
+# Load the player info and the numeric stats (Age already in decimal years)
+meta, stats = load_player_matrix(csv_path)
 
-# Initialize list to store output lines
-top3_lines = []
+# Values are written as pandas reads them from the CSV (stats with "N/a" keep their text,
+# Age as decimal years)
+labels = pd.read_csv(csv_path)
+labels['Age'] = stats['Age']
 
-# Process each column in the dataframe
-for col in df.columns:
-    # Skip non-numeric columns (player info columns)
-    if col in ["Player", "Squad", "Nation", "Position"]:
-        continue
+# Top and bottom TOP_K of every statistic in one pass over the numeric matrix (NaN ignored)
+board = leaderboards(meta, stats, k=TOP_K, group_by=GROUP_BY, labels=labels)
 
-    # Convert column to numeric, coercing errors (like 'N/a') to NaN
-    numeric_series = pd.to_numeric(df[col], errors='coerce')
+# Write results to file using UTF-8 encoding (supports special characters); a .csv or
+# .json output path writes the same leaderboard in that format
+write_leaderboard(board, output_path, k=TOP_K)
 
-    # Get top 3 highest values (ignores NaN automatically)
-    top3_high = df.loc[numeric_series.nlargest(3).index, ["Player", "Squad", "Nation", "Position", col]]
-
-    # Get top 3 lowest values (ignores NaN automatically)
-    top3_low = df.loc[numeric_series.nsmallest(3).index, ["Player", "Squad", "Nation", "Position", col]]
-
-    # Add section header for current statistic
-    top3_lines.append(f"\n=== {col} ===\n")
-
-    # Add top 3 highest players
-    top3_lines.append("Top 3 highest statistics:\n")
-    for _, row in top3_high.iterrows():
-        top3_lines.append(
-            f"{row['Player']} (Team:{row['Squad']}, Nation:{row['Nation']}, Position:{row['Position']}): {row[col]}\n")
-
-    # Add top 3 lowest players
-    top3_lines.append("\nTop 3 lowest statistics:\n")
-    for _, row in top3_low.iterrows():
-        top3_lines.append(
-            f"{row['Player']} (Team:{row['Squad']}, Nation:{row['Nation']}, Position:{row['Position']}): {row[col]}\n")
-
-    # Add extra spacing between statistics
-    top3_lines.append('\n')
-    top3_lines.append('\n')
-
-# Write results to file using UTF-8 encoding (supports special characters)
-with open(output_path, "w", encoding="utf-8") as f:
-    f.writelines(top3_lines)
+if RANK_PLAYER:
+    index = load_rank_index(csv_path)
+    try:
+        index.rows(RANK_PLAYER)
+    except KeyError:
+        print(f"Player not found: {RANK_PLAYER}")
+    else:
+        for stat in stats.columns:
+            overalls, squads = (index.ranks(RANK_PLAYER, stat, grouping) for grouping in ('overall', 'squad'))
+            for overall, squad in zip(overalls, squads):
+                if overall['rank'] is None:
+                    continue
+                print(f"{stat}: {overall['value']} - #{overall['rank']} of {overall['of']} overall, "
+                      f"#{squad['rank']} of {squad['of']} in {squad['group']}")
@@ -1,24 +1,24 @@
+import os
 import pandas as pd
-import matplotlib.pyplot as plt
+import matplotlib
 import numpy as np
-import os
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-csv_path = os.path.join(BASE_DIR, "results.csv")
-# Load the data from CSV
-df = pd.read_csv(csv_path)
+from player_data import load_player_matrix
+from histogram_report import REPORT_DIR, render_report
 
-def convert_age(age_str):
-    if pd.isna(age_str) or age_str == "N/a":
-        return np.nan
-    try:
-        if '-' not in str(age_str):
-            return float(age_str)
-        years, days = map(int, str(age_str).split('-'))
-        return round(years + days / 365, 2)
-    except:
-        return np.nan
+# HISTOGRAM_HEADLESS=1 writes one grid of histograms per statistic (all players and every
+# team) to HISTOGRAM_DIR instead of opening a window per plot; works without a display
+HEADLESS = os.environ.get("HISTOGRAM_HEADLESS", "0") == "1"
+HISTOGRAM_DIR = os.environ.get("HISTOGRAM_DIR", REPORT_DIR)
+HISTOGRAM_FORMATS = os.environ.get("HISTOGRAM_FORMATS", "png").split(',')  # png and/or pdf
+if HEADLESS:
+    matplotlib.use('Agg')
+import matplotlib.pyplot as plt
 
-df['Age'] = df['Age'].apply(convert_age)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+csv_path = os.path.join(BASE_DIR, "results.csv")
+# Load the player info and the numeric stats (Age already in decimal years)
+meta, stats = load_player_matrix(csv_path)
+df = pd.concat([meta, stats], axis=1)
 
 
 attack_stats = ['Performance_Gls', 'Goals_PerShot', 'Performance_Ast']  
@@ -63,8 +63,15 @@ def plot_selected_team_histograms(df, stats):
             except Exception as e:
                 print(f"Error plotting {stat} for {team}: {str(e)}")
 
-# Plot histograms for selected statistics across all data
-plot_selected_histograms(df, selected_stats)
+# Worker processes re-import this file when they are spawned, so the plots only run when it is
+# executed as a script
+if __name__ == "__main__":
+    if HEADLESS:
+        # Every histogram on shared bin edges, rendered to files in parallel
+        render_report(meta, stats, selected_stats, output_dir=HISTOGRAM_DIR, formats=HISTOGRAM_FORMATS)
+    else:
+        # Plot histograms for selected statistics across all data
+        plot_selected_histograms(df, selected_stats)
 
-# Plot histograms for selected statistics for all teams
-plot_selected_team_histograms(df, selected_stats)
+        # Plot histograms for selected statistics for all teams
+        plot_selected_team_histograms(df, selected_stats)
@@ -1,55 +1,29 @@
-import pandas as pd
-import numpy as np
 import os
+from player_data import load_player_matrix
+from streaming_stats import update_state
+from team_stats import team_means, team_rankings
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 csv_path = os.path.join(BASE_DIR, "results.csv")
 output_csv_path = os.path.join(BASE_DIR, "best_teams_per_statistic.csv")
-# Read the CSV file
-df = pd.read_csv(csv_path)
-
-
-
-# Function to convert age strings to numeric values
-def convert_age(age_str):
-    if pd.isna(age_str) or age_str == "N/a":
-        return np.nan
-    try:
-        if '-' not in str(age_str):
-            return float(age_str)
-        years, days = map(int, str(age_str).split('-'))
-        return round(years + days / 365, 2)
-    except:
-        return np.nan
-
-
-df['Age'] = df['Age'].apply(convert_age)
-
-# Get list of all stats columns (excluding player info columns)
-stats_columns = [col for col in df.columns if col not in ['Player', 'Squad', 'Nation', 'Position', 'Age']]
-
-# Dictionary to store results
-best_teams = {}
-
-for stat in stats_columns:
-    # Convert to numeric and ignore N/a values
-    numeric_series = pd.to_numeric(df[stat], errors='coerce')
-
-    # Calculate mean value for each team
-    team_stats = df.groupby('Squad').apply(lambda x: numeric_series[x.index].mean(),include_groups=False)
-
-    # Find team with highest value (ignore NaN)
-    if not team_stats.isna().all():
-        best_team = team_stats.idxmax()
-        best_value = team_stats.max()
-        best_teams[stat] = {
-            'Team': best_team,
-            'Value': round(best_value, 2),
-            'Statistic': stat  # Add stat name to dictionary
-        }
-
-
-# Convert results to DataFrame
-result_df = pd.DataFrame.from_dict(best_teams, orient='index')
+# STREAMING_STATS=1 reads the team means from the saved running state, updated with only
+# the players that changed since the last run
+STREAMING = os.environ.get("STREAMING_STATS", "0") == "1"
+# Load the player info and the numeric stats (Age already in decimal years)
+meta, stats = load_player_matrix(csv_path)
+
+# Get list of all stats columns (excluding Age)
+stats_columns = [col for col in stats.columns if col != 'Age']
+
+# Squad x stat table of means, from one grouped mean (or the running state)
+if STREAMING:
+    means = update_state(meta, stats).means()[stats_columns].sort_index()
+else:
+    means = team_means(meta, stats[stats_columns], by='Squad')
+
+# Best team, runner-up and gap of every stat read from the same table
+rankings = team_rankings(means)
+result_df = rankings.copy()
+result_df['Value'] = result_df['Value'].round(2)
 
 # Reorder columns: Statistic, Team, Value
 result_df = result_df[['Statistic', 'Team', 'Value']]
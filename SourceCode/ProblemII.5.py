@@ -1,47 +1,19 @@
 import pandas as pd
 import os
+from player_data import load_player_matrix
+from stat_registry import RatingEngine, is_positive_stat
+from team_stats import team_means
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+csv_path = os.path.join(BASE_DIR, "results.csv")
 input_path = os.path.join(BASE_DIR, "best_teams_per_statistic.csv")
 output_stats_path = os.path.join(BASE_DIR, "positive_stats_leaders.csv")
 output_ranking_path = os.path.join(BASE_DIR, "team_rankings_by_positive_stats.csv")
+output_rating_path = os.path.join(BASE_DIR, "team_composite_ratings.csv")
 
 # Load the CSV file
 df = pd.read_csv(input_path)
 
-# Define positive and negative metrics (convert all to lowercase)
-positive_keywords = [x.lower() for x in [
-    'Matches', 'Playing_Time_Starts', 'Minutes', 'Performance_Gls', 'Performance_Ast',
-    'Expected_xG', 'Expected_xAG', 'Progression_PrgC', 'Progression_PrgP', 'Progression_PrgR',
-    'Per_90_Minutes_Gls', 'Per_90_Minutes_Ast', 'Per_90_Minutes_xG', 'Per_90_Minutes_xAG',
-    'Save_Percentage', 'CleanSheet_Percentage', 'Penalty_Save_Percentage', 'Shots_On_Target_Percentage',
-    'Shots_On_Target_Per90', 'Goals_PerShot', 'Total_Passes_Completed', 'Total_Passes_Completed_Percentage',
-    'Short_Passe_Completed_Percentage', 'Medium_Passes_Completed_Percentage', 'Long_Passes_Completed_Percentage',
-    'Keypasses', 'Passes_Into_Final_Third', 'Passes_Into_Penalty_Area', 'Crossed_Into_Penalty_Area',
-    'Progressive_Passes', 'Shot_Creating_Actions', 'Shot_Creating_Actions_Per90', 'Goal_Creating_Actions',
-    'Goal_Creating_Actions_Per90', 'Tackles', 'Tackles_Won', 'Defensive_Actions_Attempted', 'Blocks',
-    'Shots_Blocked', 'Passes_Blocked', 'Interceptions', 'Touches', 'Touches_Def_3rd', 'Touches_Mid_3rd',
-    'Touches_Att_3rd', 'Touches_Att_Pen', 'Take_Ons_Attempted', 'Take_Ons_Success_Percentage', 'Carries',
-    'Progressive_Carrying_Distance', 'Progressive_Carries', 'Carries_Into_Final_Third', 'Carries_Into_Penalty_Area',
-    'Receiving', 'Progressive_Receiving', 'Fouled', 'Crosses', 'Recoveries', 'Aerial_Duels_Won', 'Aerial_Duels_Wonpct'
-]]
-
-negative_keywords = [x.lower() for x in [
-    'Yellow_Cards', 'Red_Cards', 'Goals_Against_Per90', 'Defensive_Actions_Lost', 'Miscontrols',
-    'Dispossessions', 'Fouls', 'Offsides', 'Aerial_Duels_Lost', 'Take_Ons_Tackled_Percentage'
-]]
-
-
-def is_positive_stat(stat_name):
-    stat_name = str(stat_name).lower()
-    return any(keyword.lower() == stat_name for keyword in positive_keywords)
-
-
-def is_negative_stat(stat_name):
-    stat_name = str(stat_name).lower()
-    return any(keyword.lower() == stat_name for keyword in negative_keywords)
-
-
-# Analyze positive stats
+# Analyze positive stats (stat polarity comes from the stat registry)
 positive_stats = []
 team_scores = {}
 
@@ -85,8 +57,26 @@ if not ranked_teams.empty:
     print(f"Best-performing team: {top_team} (Leads in {top_score} positive stats)")
     print(f"Key strengths: {', '.join(dominant_stats[:5])}... (and {len(dominant_stats) - 5} more stats)")
 
+    # Composite rating: weighted, polarity-adjusted z-scores of every team's mean in every stat
+    meta, stats = load_player_matrix(csv_path)
+    engine = RatingEngine(team_means(meta, stats, by='Squad'))
+    schemes = {
+        'Rating': engine.weights(),
+        'Attack_Rating': engine.weights(categories={'possession': 0, 'defence': 0, 'goalkeeping': 0,
+                                                    'discipline': 0, 'general': 0}),
+        'Defence_Rating': engine.weights(categories={'attack': 0, 'possession': 0, 'general': 0}),
+    }
+    ratings = engine.ratings(pd.DataFrame(schemes).to_numpy())
+    ratings.columns = list(schemes)
+    ratings = ratings.round(3).sort_values(by='Rating', ascending=False)
+    ratings.index.name = 'Team'
+
+    print("\n=== COMPOSITE TEAM RATINGS ===")
+    print(ratings.to_string())
+
     # Export to CSV
     result_df.to_csv(output_stats_path, index=False)
     ranked_teams.to_csv(output_ranking_path, index=True)
+    ratings.to_csv(output_rating_path, index=True)
 else:
     print("No positive stats found in the data.")
@@ -1,110 +1,113 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.impute import SimpleImputer
-from sklearn.cluster import KMeans
 from sklearn.decomposition import PCA
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.metrics import silhouette_score
 import os
+from feature_matrix import load_feature_matrix, partition_sources
+from kmeans_sweep import sweep
+from silhouette import EXACT_LIMIT, approximation_report
+from player_data import load_player_matrix
+from streaming_kmeans import fold_in
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 csv_path = os.path.join(BASE_DIR, "results.csv")
-#  Read data
-df = pd.read_csv(csv_path)
-
-#  Convert 'Age' column from "years-days" string format to float
-def convert_age(age_str):
-    if pd.isna(age_str) or age_str == "N/a":
-        return np.nan
-    try:
-        if '-' not in str(age_str):
-            return float(age_str)
-        years, days = map(int, str(age_str).split('-'))
-        return round(years + days / 365, 2)
-    except:
-        return np.nan
-
-df['Age'] = df['Age'].apply(convert_age)
-
-#  Filter numeric columns
-non_numeric_cols = ['Player', 'Nation', 'Squad', 'Position']
-numeric_df = df.drop(columns=non_numeric_cols, errors='ignore')
-
-#  Handle remaining 'N/a' values
-numeric_df = numeric_df.replace('N/a', np.nan)
-
-#  Convert to float type
-for col in numeric_df.columns:
-    numeric_df[col] = pd.to_numeric(numeric_df[col], errors='coerce')
-
-#  Handle missing values
-imputer = SimpleImputer(strategy='mean')
-numeric_filled = pd.DataFrame(imputer.fit_transform(numeric_df), columns=numeric_df.columns)
-
-#  Standardize data
-scaler = StandardScaler()
-scaled_data = scaler.fit_transform(numeric_filled)
-
-silhouette_scores = []
-for k in range(2, 11):
-    kmeans = KMeans(n_clusters=k, random_state=0, n_init=50)
-    cluster_labels = kmeans.fit_predict(scaled_data)
-    silhouette_avg = silhouette_score(scaled_data, cluster_labels)
-    silhouette_scores.append(silhouette_avg)
-
-#  Silhouette Score
-plt.figure(figsize=(8, 5))
-plt.plot(range(2, 11), silhouette_scores, marker='o', linestyle='--')
-plt.title('Silhouette Score for Optimal k')
-plt.xlabel('Number of Clusters (k)')
-plt.ylabel('Silhouette Score')
-plt.grid(True)
-plt.xticks(range(2, 11))
-plt.show()
-
-#  Elbow method to determine optimal number of clusters
-wcss = []
-for i in range(1, 11):
-    kmeans = KMeans(n_clusters=i, init='k-means++', random_state=42, n_init=10)
-    kmeans.fit(scaled_data)
-    wcss.append(kmeans.inertia_)
-
-plt.figure(figsize=(8, 5))
-plt.plot(range(1, 11), wcss, marker='o')
-plt.title('Elbow Method to Choose k')
-plt.xlabel('Number of Clusters')
-plt.ylabel('WCSS')
-plt.grid(True)
-plt.show()
-# We chose to classify the players into 8 groups using the K-means algorithm.
-#We used the Elbow Method, which plots the Within-Cluster Sum of Squares (WCSS) for different values of k (number of clusters).
-#The “elbow” point — where the rate of WCSS decrease slows down — was found at k = 8, indicating that 8 clusters provide a good balance between accuracy and simplicity.
-#This means that increasing beyond 8 clusters only marginally reduces the WCSS, while making interpretation more complex.
-
-#  Apply KMeans with k=8
-kmeans = KMeans(n_clusters=8, init='k-means++', n_init=50, random_state=42)
-clusters = kmeans.fit_predict(scaled_data)
-
-#  Assign cluster labels to original DataFrame
-df['cluster'] = clusters
-
-#  Analyze characteristics of each cluster
-print("=== Average metrics by cluster ===")
-cluster_profiles = df.groupby('cluster').mean(numeric_only=True)
-print(cluster_profiles)
-
-#  PCA for dimensionality reduction to 2D
-pca = PCA(n_components=2)
-pca_result = pca.fit_transform(scaled_data)
-
-#  Plot clusters
-plt.figure(figsize=(10, 6))
-sns.scatterplot(x=pca_result[:, 0], y=pca_result[:, 1], hue=clusters, palette='tab10', s=60)
-plt.title('K-means Clustering (k=8) with PCA Reduction')
-plt.xlabel('Principal Component 1')
-plt.ylabel('Principal Component 2')
-plt.legend(title='Cluster')
-plt.grid(True)
-plt.tight_layout()
-plt.show()
+# Silhouette scoring: 'auto' (exact on small data, sampled on large), 'exact', 'sampled' or
+# 'simplified' (centroid based); SILHOUETTE_SAMPLE_SIZE players are scored when sampling
+SILHOUETTE_METHOD = os.environ.get("SILHOUETTE_METHOD", "auto")
+SILHOUETTE_SAMPLE_SIZE = int(os.environ.get("SILHOUETTE_SAMPLE_SIZE", "2000"))
+# CLUSTER_MODE=streaming fits resumable mini-batch KMeans chunk by chunk instead of the full k sweep
+CLUSTER_MODE = os.environ.get("CLUSTER_MODE", "full")
+
+
+def cluster_batch():
+    """(players frame, scaled matrix, k=8 labels) from the full k sweep over results.csv"""
+    #  Load the shared player x stat matrix, rebuilt only when results.csv changed.
+    #  'scaled' is already mean-imputed and standardized (SimpleImputer + StandardScaler);
+    #  its rows are grouped by squad, 'inverse' puts them back in the order of results.csv
+    features = load_feature_matrix([csv_path])
+    scaled_data = np.asarray(features.scaled[features.inverse], dtype=np.float64)
+    df = pd.concat([features.meta.iloc[features.inverse].reset_index(drop=True),
+                    features.frame('raw', features.inverse)], axis=1)
+
+    #  Fit KMeans once for every k (in parallel, cached by data and parameters); the
+    #  silhouette and elbow plots and the final k=8 model all come from the same fits
+    K_RANGE = range(1, 11)
+    fits = sweep(scaled_data, ks=K_RANGE, n_init=50, random_state=42,
+                 silhouette_method=SILHOUETTE_METHOD, sample_size=SILHOUETTE_SAMPLE_SIZE)
+    silhouette_scores = [fits[k]['silhouette'] for k in range(2, 11)]
+
+    #  Silhouette Score
+    plt.figure(figsize=(8, 5))
+    plt.plot(range(2, 11), silhouette_scores, marker='o', linestyle='--')
+    plt.title('Silhouette Score for Optimal k')
+    plt.xlabel('Number of Clusters (k)')
+    plt.ylabel('Silhouette Score')
+    plt.grid(True)
+    plt.xticks(range(2, 11))
+    plt.show()
+
+    #  Elbow method to determine optimal number of clusters
+    wcss = [fits[k]['inertia'] for k in K_RANGE]
+
+    plt.figure(figsize=(8, 5))
+    plt.plot(range(1, 11), wcss, marker='o')
+    plt.title('Elbow Method to Choose k')
+    plt.xlabel('Number of Clusters')
+    plt.ylabel('WCSS')
+    plt.grid(True)
+    plt.show()
+    # We chose to classify the players into 8 groups using the K-means algorithm.
+    #We used the Elbow Method, which plots the Within-Cluster Sum of Squares (WCSS) for different values of k (number of clusters).
+    #The “elbow” point — where the rate of WCSS decrease slows down — was found at k = 8, indicating that 8 clusters provide a good balance between accuracy and simplicity.
+    #This means that increasing beyond 8 clusters only marginally reduces the WCSS, while making interpretation more complex.
+
+    #  KMeans with k=8, reused from the sweep
+    kmeans = fits[8]['model']
+    clusters = fits[8]['labels']
+
+    #  On data small enough for the exact score, show how close the approximations get
+    if len(scaled_data) <= EXACT_LIMIT:
+        print("=== Silhouette approximations for k=8 ===")
+        print(approximation_report(scaled_data, clusters, kmeans.cluster_centers_).to_string(index=False))
+    return df, scaled_data, clusters
+
+
+def cluster_streaming():
+    """(players frame, scaled matrix, labels) of results.csv from the streaming model"""
+    #  Mini-batch KMeans over every results file (all partitions when there are any),
+    #  read in chunks and folded into the saved state; files already folded in are skipped
+    stream = fold_in(partition_sources() or [csv_path], n_clusters=8)
+    meta, stats = load_player_matrix(csv_path)
+    df = pd.concat([meta, stats], axis=1)
+    clusters = stream.predict(stats)
+    scaled_data = stream.transform(stats.reindex(columns=stream.columns).to_numpy())
+    return df, scaled_data, clusters
+
+
+# Worker processes re-import this file when they are spawned, so the analysis only runs
+# when it is executed as a script
+if __name__ == "__main__":
+    df, scaled_data, clusters = cluster_streaming() if CLUSTER_MODE == 'streaming' else cluster_batch()
+
+    #  Assign cluster labels to original DataFrame
+    df['cluster'] = clusters
+
+    #  Analyze characteristics of each cluster
+    print("=== Average metrics by cluster ===")
+    cluster_profiles = df.groupby('cluster').mean(numeric_only=True)
+    print(cluster_profiles)
+
+    #  PCA for dimensionality reduction to 2D
+    pca = PCA(n_components=2)
+    pca_result = pca.fit_transform(scaled_data)
+
+    #  Plot clusters
+    plt.figure(figsize=(10, 6))
+    sns.scatterplot(x=pca_result[:, 0], y=pca_result[:, 1], hue=clusters, palette='tab10', s=60)
+    plt.title('K-means Clustering (k=8) with PCA Reduction')
+    plt.xlabel('Principal Component 1')
+    plt.ylabel('Principal Component 2')
+    plt.legend(title='Cluster')
+    plt.grid(True)
+    plt.tight_layout()
+    plt.show()
@@ -1,5 +1,6 @@
 import os
 import pandas as pd
+from player_data import write_results_store
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 input_path = os.path.join(BASE_DIR, "final_players_with_etv.csv")
 input_path_1 = os.path.join(BASE_DIR, "results.csv")
@@ -7,12 +8,18 @@ input_path_1 = os.path.join(BASE_DIR, "results.csv")
 df_etv = pd.read_csv(input_path)  # File containing the 'etv' column
 df_results = pd.read_csv(input_path_1)  # File containing the results
 
-# Assume you have a common column 'player_id' or 'player_name' between the two files
-# Replace 'Player' with your common column (if any)
-df_merged = pd.merge(df_results, df_etv[['Player', 'ETV']], on='Player', how='inner')
+# Join on the registry player ID when both files carry it (see player_registry.py),
+# otherwise fall back to the raw 'Player' string
+if 'Player_ID' in df_results.columns and 'Player_ID' in df_etv.columns:
+    df_merged = pd.merge(df_results, df_etv[['Player_ID', 'ETV']].dropna(subset=['Player_ID']),
+                         on='Player_ID', how='inner')
+else:
+    df_merged = pd.merge(df_results, df_etv[['Player', 'ETV']], on='Player', how='inner')
 
 # Save the results to a new CSV file
 output_file = os.path.join(os.path.dirname(__file__), 'results_with_etv.csv')
 df_merged.to_csv(output_file, index=False)
+# The CSV keeps the "N/a" text of the inputs; only the typed Arrow copy has real nulls
+write_results_store(df_merged, output_file)
 
 print("The 'etv' column has been added and successfully saved to 'results_with_etv.csv'.")
@@ -11,43 +11,34 @@ from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
 from scipy import stats
 from sklearn.feature_selection import SelectKBest, mutual_info_regression, f_regression
 import warnings
+from money import parse_money
+from player_data import load_player_matrix
 warnings.filterwarnings('ignore')
 
-# Load dataset
-df = pd.read_csv('results_with_etv.csv')
+# Load dataset: player info (ETV still the raw money string) and the numeric stats
+meta, player_stats = load_player_matrix('results_with_etv.csv', age_decimals=None)
+df = pd.concat([meta, player_stats], axis=1)
 
 # Remove outlier
 df = df[df['Player'] != 'Mohamed Salah']
 
 # Step 2: Data Preprocessing
-df['ETV'] = df['ETV'].str.replace(r'[€M]', '', regex=True).astype(float)
+df['ETV'] = parse_money(df['ETV'])  # millions of euros
+df = df.dropna(subset=['ETV'])
 df['ETV'] = np.clip(df['ETV'], df['ETV'].quantile(0.05), df['ETV'].quantile(0.95))
 df['ETV'] = np.log1p(df['ETV'])
 
-def convert_age(age):
-    try:
-        if isinstance(age, (int, float)):
-            return float(age)
-        if '-' in str(age):
-            y, d = map(int, str(age).split('-'))
-            return y + d / 365
-        return float(age)
-    except:
-        return np.nan
-
-df['Age'] = df['Age'].apply(convert_age)
+# Age is already in decimal years (unrounded until here)
 df['Age'] = df['Age'].fillna(df['Age'].median()).round(1)
 
-non_numeric_cols = ['Player', 'Nation', 'Squad', 'Position']
-for col in df.columns:
-    if col not in non_numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+# Every stat is already float, fill the gaps in one go
+df[player_stats.columns] = df[player_stats.columns].fillna(0)
 
 # Step 3: EDA - Skipped visualizations for brevity
 
 # Step 4: Feature Engineering
 def engineer_features(df):
-    X = df.drop(columns=['ETV', 'Player', 'Nation', 'Squad'])
+    X = df.drop(columns=['ETV', 'Player', 'Player_ID', 'Nation', 'Squad'], errors='ignore')
     y = df['ETV']
     if 'Position' in X.columns:
         X = X.drop(columns=['Position'])
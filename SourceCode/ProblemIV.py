@@ -1,5 +1,12 @@
 
 import os
+import re
+import json
+import shutil
+import sqlite3
+from datetime import date
+from urllib.parse import urlsplit
+from multiprocessing.util import Finalize
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -7,11 +14,18 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
-from fuzzywuzzy import fuzz, process
+import numpy as np
 import pandas as pd
 import time
-import requests
+import uuid
 from bs4 import BeautifulSoup
+from name_matching import NameMatcher
+from player_data import RESULTS_CSV
+from player_registry import PlayerRegistry
+from player_store import PlayerStore
+from money import format_money, parse_money
+from scraping import (DriverPool, SharedHostRateLimiter, fetch_html, response_cache, run_workers,
+                      save_recorded_page)
 
 
 def setup_driver():
@@ -56,95 +70,279 @@ def clean_player_name(name):
     return sorted_name
 
 
-def scrape_all_pages(total_pages=22):
-    all_players = []
-    all_etvs = []
+# Point ETV_BASE_URL at a local server (see scraping.serve_recorded_pages) to run offline
+# against pages recorded with ETV_RECORD_DIR.
+BASE_URL = os.environ.get("ETV_BASE_URL", "https://www.footballtransfers.com").rstrip('/')
+RECORD_DIR = os.environ.get("ETV_RECORD_DIR")
+PARALLEL_PAGES = int(os.environ.get("ETV_PARALLEL_PAGES", "4"))  # worker processes, 1 = sequential
+REQUESTS_PER_SECOND = float(os.environ.get("ETV_REQUESTS_PER_SECOND", "1"))  # per host, shared by all workers
+
+VALUATION_URL = BASE_URL + "/us/values/players/most-valuable-soccer-players/playing-in-uk-premier-league/{page}"
+DEFAULT_TOTAL_PAGES = 22  # used when the pagination cannot be read
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scrape_checkpoints', 'etv')
+# An interrupted run is only resumed within this many hours; older checkpoints are scraped again
+CHECKPOINT_TTL_HOURS = float(os.environ.get("ETV_CHECKPOINT_TTL_HOURS", "24"))
+
+# Stable player IDs shared with Problem I
+registry = PlayerRegistry()
+
+
+def load_page_with_driver(driver, url):
+    """Render a page in the browser and return its HTML once the valuation table is there"""
+    driver.get(url)
+    print("Page loaded, waiting for content...")
+
+    try:
+        WebDriverWait(driver, 15).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "table.table--player-valuations")))
+        print("Table found")
+    except:
+        print("Table not found, trying alternative approach")
+        time.sleep(5)
+
+    return driver.page_source
+
+
+def parse_valuation_rows(html):
+    """Extract (player, etv) pairs from a valuation page in one pass over its HTML"""
+    soup = BeautifulSoup(html, 'html.parser')
+    rows = soup.select("table.table--player-valuations tbody tr")
+    if not rows:
+        rows = soup.select("table.table tbody tr")
+
+    players = []
+    etvs = []
+    for row in rows:
+        if "table-placeholder" in row.get('class', []):
+            continue
 
+        name_cell = row.select_one(".player-name") or row.select_one("td:nth-child(3)")
+        value_cell = row.select_one(".player-value") or row.select_one("td:nth-child(6)")
+        if name_cell is None or value_cell is None:
+            continue
+
+        player_name = name_cell.get_text('\n', strip=True)
+        etv_value = value_cell.get_text(strip=True)
+        if player_name and etv_value:
+            players.append(player_name)
+            etvs.append(etv_value)
+
+    return players, etvs
+
+
+def detect_total_pages(html):
+    """Number of valuation pages according to the pagination links, None if there are none"""
+    pages = [int(n) for n in re.findall(r'playing-in-uk-premier-league/(\d+)', html)]
+    return max(pages) if pages else None
+
+
+def _write_json(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def start_run(checkpoint_dir, ttl_hours=CHECKPOINT_TTL_HOURS):
+    """Run id for the checkpoints of this scrape.
+
+    The id of the interrupted run in checkpoint_dir is reused when that run started
+    less than ttl_hours ago; otherwise its checkpoints are removed and a new run starts."""
+    run_path = os.path.join(checkpoint_dir, 'run.json')
+    try:
+        with open(run_path, encoding='utf-8') as f:
+            run = json.load(f)
+        if time.time() - run['started_at'] < ttl_hours * 3600:
+            return run['run_id']
+        print("Checkpoints of the last run are too old, starting over")
+    except (OSError, ValueError, KeyError):
+        pass
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    run_id = uuid.uuid4().hex
+    _write_json(run_path, {'run_id': run_id, 'started_at': time.time()})
+    return run_id
+
+
+def load_checkpoints(checkpoint_dir, run_id, ttl_hours=CHECKPOINT_TTL_HOURS):
+    """Pages finished by an interrupted run: {page: checkpoint}.
+
+    Only checkpoints of run_id scraped less than ttl_hours ago count; any others are removed."""
+    checkpoints = {}
+    if not os.path.isdir(checkpoint_dir):
+        return checkpoints
+
+    oldest = time.time() - ttl_hours * 3600
+    for file_name in os.listdir(checkpoint_dir):
+        match = re.fullmatch(r'page_(\d+)\.json', file_name)
+        if not match:
+            continue
+        path = os.path.join(checkpoint_dir, file_name)
+        try:
+            with open(path, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable checkpoint {file_name}: {e}")
+            continue
+        if checkpoint.get('run_id') != run_id or checkpoint.get('scraped_at', 0) < oldest:
+            print(f"Discarding checkpoint {file_name} from another or an expired run")
+            os.remove(path)
+            continue
+        checkpoints[int(match.group(1))] = checkpoint
+    return checkpoints
+
+
+def save_checkpoint(checkpoint_dir, page, players, etvs, total_pages, run_id):
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    _write_json(os.path.join(checkpoint_dir, f"page_{page}.json"),
+                {'run_id': run_id, 'scraped_at': time.time(), 'players': players, 'etvs': etvs,
+                 'total_pages': total_pages})
+
+
+def create_driver():
+    """setup_driver for the driver pool, which needs an exception rather than None"""
     driver = setup_driver()
-    if not driver:
-        return pd.DataFrame()
+    if driver is None:
+        raise RuntimeError("Could not start the browser")
+    return driver
+
+
+# State of each worker process, filled in by _init_worker
+_worker = {}
+
+
+def _init_worker(limiter, checkpoints, checkpoint_dir, run_id):
+    _worker['limiter'] = limiter
+    _worker['checkpoints'] = checkpoints
+    _worker['checkpoint_dir'] = checkpoint_dir
+    _worker['run_id'] = run_id
+    # Each worker starts at most one browser, and only for pages whose HTML has no rows
+    drivers = DriverPool(1, create_driver)
+    _worker['drivers'] = drivers
+    Finalize(None, drivers.close, exitpriority=10)
+
+
+def scrape_page(page):
+    """(players, etvs, page count seen on the page) for one page; players is None on failure"""
+    checkpoint = _worker['checkpoints'].get(page)
+    checkpoint_dir = _worker['checkpoint_dir']
+    drivers = _worker['drivers']
+    limiter = _worker['limiter']
+    url = VALUATION_URL.format(page=page)
+    print(f"\nScraping page {page}: {url}")
+
+    if checkpoint is not None:
+        print(f"Page {page} restored from checkpoint")
+        return checkpoint['players'], checkpoint['etvs'], checkpoint.get('total_pages')
 
     try:
-        for page in range(1, total_pages + 1):
-            url = f"https://www.footballtransfers.com/us/values/players/most-valuable-soccer-players/playing-in-uk-premier-league/{page}"
-            print(f"\nScraping page {page}: {url}")
-
-            try:
-                driver.get(url)
-                print("Page loaded, waiting for content...")
-
-                try:
-                    WebDriverWait(driver, 15).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "table.table--player-valuations")))
-                    print("Table found")
-                except:
-                    print("Table not found, trying alternative approach")
-                    time.sleep(5)
-
-                rows = []
-                try:
-                    rows = driver.find_elements(By.CSS_SELECTOR, "table.table--player-valuations tbody tr")
-                    if not rows:
-                        rows = driver.find_elements(By.CSS_SELECTOR, "table.table tbody tr")
-                except:
-                    print("Could not find table rows")
-                    continue
-
-                for row in rows:
-                    try:
-                        if "table-placeholder" in row.get_attribute("class"):
-                            continue
-
-                        player_name = ""
-                        try:
-                            player_name = row.find_element(By.CSS_SELECTOR, ".player-name").text.strip()
-                        except:
-                            try:
-                                player_name = row.find_element(By.CSS_SELECTOR, "td:nth-child(3)").text.strip()
-                            except:
-                                continue
-
-                        etv_value = ""
-                        try:
-                            etv_value = row.find_element(By.CSS_SELECTOR, ".player-value").text.strip()
-                        except:
-                            try:
-                                etv_value = row.find_element(By.CSS_SELECTOR, "td:nth-child(6)").text.strip()
-                            except:
-                                continue
-
-                        if player_name and etv_value:
-                            all_players.append(player_name)
-                            all_etvs.append(etv_value)
-
-                    except Exception as e:
-                        print(f"Error processing row: {e}")
-                        continue
-
-                print(f"Found {len(rows)} rows on page {page}")
-                time.sleep(2)
-
-            except Exception as e:
-                print(f"Error scraping page {page}: {e}")
-                continue
-
-        print(f"\nTotal players scraped: {len(all_players)}")
-        return pd.DataFrame({'Player': all_players, 'ETV': all_etvs})
+        # Plain HTTP first (cached and revalidated); the browser only when that has no rows
+        if response_cache.needs_network(url):
+            limiter.wait(url)
+        html = fetch_html(url)
+        players, etvs = parse_valuation_rows(html) if html else ([], [])
+
+        if not players and not response_cache.cache_only:
+            print(f"No rows in the HTML of page {page}, loading it in the browser")
+            with drivers.session() as driver:
+                # Wait for a request slot only once a browser is free, right before it loads the page
+                limiter.wait(url)
+                html = load_page_with_driver(driver, url)
+            response_cache.store(url, html)
+            players, etvs = parse_valuation_rows(html)
+
+        if html is None:
+            print(f"Page {page} is not available")
+            return None, None, None
+
+        if RECORD_DIR:
+            save_recorded_page(RECORD_DIR, url, html)
+
+        detected_pages = detect_total_pages(html)
+        if players:
+            save_checkpoint(checkpoint_dir, page, players, etvs, detected_pages, _worker['run_id'])
+        print(f"Found {len(players)} players on page {page}")
+        return players, etvs, detected_pages
+
+    except Exception as e:
+        print(f"Error scraping page {page}: {e}")
+        return None, None, None
+
+
+def scrape_all_pages(total_pages=None, checkpoint_dir=CHECKPOINT_DIR, parallel_pages=PARALLEL_PAGES):
+    """Scrape every valuation page; total_pages=None reads the page count from the site.
+
+    After the first page, the others are fetched by parallel_pages worker processes,
+    on the same scheduler as the fbref scraper (scraping.run_workers). Each finished
+    page is checkpointed to checkpoint_dir under the id of the run, so a rerun after a
+    crash resumes where it stopped, for up to CHECKPOINT_TTL_HOURS. The checkpoints are
+    removed once every page is done."""
+    run_id = start_run(checkpoint_dir)
+    checkpoints = load_checkpoints(checkpoint_dir, run_id)
+    if checkpoints:
+        print(f"Resuming: {len(checkpoints)} pages already done")
+
+    limiter = SharedHostRateLimiter({urlsplit(BASE_URL).netloc}, REQUESTS_PER_SECOND)
+    worker_args = (limiter, checkpoints, checkpoint_dir, run_id)
+
+    try:
+        # The first page also tells how many pages there are; it is scraped in this process
+        _init_worker(*worker_args)
+        try:
+            results = {1: scrape_page(1)}
+        finally:
+            _worker['drivers'].close()
+        if total_pages is None:
+            total_pages = results[1][2] or DEFAULT_TOTAL_PAGES
+            print(f"Scraping {total_pages} pages")
+
+        try:
+            for page, future in run_workers(scrape_page, range(2, total_pages + 1), parallel_pages,
+                                            _init_worker, worker_args):
+                results[page] = future.result()
+        finally:
+            # Only holds a browser when the pages ran in this process
+            _worker['drivers'].close()
 
     except Exception as e:
         print(f"Error during scraping: {e}")
         return pd.DataFrame()
-    finally:
-        driver.quit()
 
+    all_players = []
+    all_etvs = []
+    completed_pages = 0
+    for page in sorted(results):
+        players, etvs, _ = results[page]
+        if players:
+            all_players.extend(players)
+            all_etvs.extend(etvs)
+            completed_pages += 1
+
+    print(f"\nTotal players scraped: {len(all_players)}")
+    if completed_pages == total_pages:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    return pd.DataFrame({'Player': all_players, 'ETV': all_etvs})
 
-def prepare_local_data(csv_path='result.csv'):
+
+def prepare_local_data(csv_path='result.csv', min_minutes=900):
     try:
-        local_df = pd.read_csv(csv_path)
         columns_to_keep = ['Player', 'Nation', 'Squad', 'Age', 'Position']
-
-        existing_columns = [col for col in columns_to_keep if col in local_df.columns]
-        local_df = local_df[existing_columns]
+        try:
+            # Players over the minutes threshold, straight from the indexed store of Problem I's
+            # results.csv; result.csv (an older export) is only read when the store cannot be opened
+            with PlayerStore() as store:
+                existing_columns = [col for col in columns_to_keep if col in store.columns]
+                local_df = store.find(columns=existing_columns, Minutes__gt=min_minutes)
+            source_path = RESULTS_CSV
+        except (OSError, sqlite3.Error) as e:
+            print(f"Player store unavailable ({e}), reading {csv_path}")
+            local_df = pd.read_csv(csv_path)
+            existing_columns = [col for col in columns_to_keep if col in local_df.columns]
+            local_df = local_df[existing_columns]
+            source_path = csv_path
+        # The ages (and so the birth years the registry tells namesakes apart by) are as of the scrape
+        scraped_on = date.fromtimestamp(os.path.getmtime(source_path))
+        local_df = registry.stamp(local_df, source='fbref', reference_date=scraped_on)
 
         local_df['Clean_Name'] = local_df['Player'].apply(clean_player_name)
 
@@ -184,14 +382,16 @@ def manually_assign_etv(df):
         'Victor Bernth Kristiansen': '€23.9M'
     }
 
-    normalized_mapping = {clean_player_name(k): v for k, v in manual_etv_mapping.items()}
+    # Parse and re-format the manual values, so any currency or K/M/B suffix ends up as '€<x>M' (or '€<x>K')
+    manual_values = format_money(parse_money(list(manual_etv_mapping.values())))
+    normalized_mapping = dict(zip(map(clean_player_name, manual_etv_mapping), manual_values))
+
+    missing = df_filled['ETV'].isna()
+    manual_etv = df_filled.loc[missing, 'Player'].map(clean_player_name).map(normalized_mapping).dropna()
+    df_filled.loc[manual_etv.index, 'ETV'] = manual_etv
 
-    for idx, row in df_filled.iterrows():
-        if pd.isna(row['ETV']):
-            clean_name = clean_player_name(row['Player'])
-            if clean_name in normalized_mapping:
-                df_filled.at[idx, 'ETV'] = normalized_mapping[clean_name]
-                print(f"Manually assigned ETV for {row['Player']}: {normalized_mapping[clean_name]}")
+    for player, etv in zip(df_filled.loc[manual_etv.index, 'Player'], manual_etv):
+        print(f"Manually assigned ETV for {player}: {etv}")
 
     return df_filled
 
@@ -205,14 +405,55 @@ def merge_data(local_df, scraped_df):
     print("\nSample local names:", local_df['Clean_Name'].head().tolist())
     print("Sample scraped names:", scraped_df['Clean_Name'].head().tolist())
 
+    # ETV_Row is the position of the scraped row, so every one is handed out only once below
+    scraped_rows = scraped_df[['Clean_Name', 'ETV', 'Player']].rename(columns={'Player': 'ETV_Player'})
+    scraped_rows['ETV_Row'] = np.arange(len(scraped_rows))
     merged_df = pd.merge(
         local_df,
-        scraped_df[['Clean_Name', 'ETV']],
+        scraped_rows,
         on='Clean_Name',
         how='left'
     )
 
-    merged_df = merged_df.drop('Clean_Name', axis=1)
+    # Players without an exact name match go through the fuzzy matcher
+    merged_df['Match_Score'] = float('nan')
+    missing = merged_df['ETV'].isna()
+    if missing.any():
+        matcher = NameMatcher(scraped_df['Player'])
+        matches = matcher.match(merged_df.loc[missing, 'Player'])
+        accepted = (matches['Match_Index'] >= 0) & ~matches['Ambiguous']
+
+        # One local player per scraped row: rows taken by an exact match are not handed out
+        # again, and of several players matching the same row only the best score gets it
+        claims = matches[accepted & ~matches['Match_Index'].isin(merged_df['ETV_Row'].dropna())]
+        winners = claims.sort_values('Score', ascending=False, kind='mergesort').drop_duplicates('Match_Index')
+        taken = accepted & ~matches.index.isin(winners.index)
+        accepted &= ~taken
+        if taken.any():
+            print(f"{taken.sum()} fuzzy matches left without ETV, their row already belongs to another player:")
+            print(matches.loc[taken, ['Query', 'Match', 'Score']].to_string(index=False))
+
+        scraped_etv = scraped_df['ETV'].reset_index(drop=True)
+        merged_df.loc[missing, 'ETV'] = scraped_etv.reindex(matches['Match_Index'].where(accepted, -1)).to_numpy()
+        merged_df.loc[missing, 'ETV_Player'] = matches['Match'].where(accepted).to_numpy()
+        merged_df.loc[missing, 'Match_Score'] = matches['Score'].where(accepted).to_numpy()
+        print(f"\nFuzzy matched {accepted.sum()} of {missing.sum()} players without an exact name match")
+
+        ambiguous = matches[matches['Ambiguous']]
+        if not ambiguous.empty:
+            print("Ambiguous matches left without ETV:")
+            print(ambiguous[['Query', 'Match', 'Score', 'Runner_Up', 'Runner_Up_Score']].to_string(index=False))
+
+    # Remember how footballtransfers spells each matched player; fuzzy matches are only
+    # suggested, until confirmed with PlayerRegistry.confirm
+    linked = merged_df.dropna(subset=['ETV_Player', 'Player_ID'])
+    for etv_player, player_id, score in zip(linked['ETV_Player'], linked['Player_ID'], linked['Match_Score']):
+        if pd.isna(score):
+            registry.link(etv_player, 'footballtransfers', int(player_id))
+        else:
+            registry.suggest(etv_player, 'footballtransfers', int(player_id), score)
+
+    merged_df = merged_df.drop(['Clean_Name', 'ETV_Player', 'ETV_Row', 'Match_Score'], axis=1)
 
     cols = merged_df.columns.tolist()
     cols = [cols[0]] + [cols[-1]] + cols[1:-1]
@@ -230,7 +471,7 @@ def main():
         return
 
     print("\nStarting web scraping for all pages...")
-    scraped_data = scrape_all_pages(total_pages=22)
+    scraped_data = scrape_all_pages()
 
     if not scraped_data.empty:
         print("\nMerging data...")
@@ -238,6 +479,7 @@ def main():
 
         if not final_df.empty:
             final_df = manually_assign_etv(final_df)
+            registry.save()
 
             print("\nFinal Merged Data (first 5 rows):")
             print(final_df.head())
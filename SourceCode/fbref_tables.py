@@ -0,0 +1,171 @@
+import pandas as pd
+from io import StringIO
+from selenium.webdriver.common.by import By
+from scraping import extract_table_html, fetch_html, response_cache, save_recorded_page, wait_for_element
+
+KEY_COLUMNS = ['Player', 'Squad']
+
+# fbref competition id -> name used in its URLs
+COMPETITIONS = {
+    9: 'Premier-League',
+    12: 'La-Liga',
+    11: 'Serie-A',
+    20: 'Bundesliga',
+    13: 'Ligue-1',
+}
+
+# fbref page -> id of the player table on that page
+TABLE_TYPES = {
+    'stats': 'stats_standard',
+    'keepers': 'stats_keeper',
+    'shooting': 'stats_shooting',
+    'passing': 'stats_passing',
+    'gca': 'stats_gca',
+    'defense': 'stats_defense',
+    'possession': 'stats_possession',
+    'misc': 'stats_misc',
+}
+
+
+def table_url(base_url, competition, season, table_type):
+    """URL of one stats page; season None is the current season"""
+    name = COMPETITIONS[competition]
+    if season is None:
+        return f"{base_url}/en/comps/{competition}/{table_type}/{name}-Stats"
+    return f"{base_url}/en/comps/{competition}/{season}/{table_type}/{season}-{name}-Stats"
+
+
+def parse_table_html(html):
+    # Use StringIO to avoid the FutureWarning
+    df = pd.read_html(StringIO(html))[0]
+
+    # Clean multi-index columns
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = ['_'.join(col).strip() for col in df.columns.values]
+
+    # Standardize column names
+    df.columns = df.columns.str.replace(r'%', 'pct', regex=True)
+    df.columns = df.columns.str.replace(r'[^a-zA-Z0-9_]', '_', regex=True)
+
+    return df
+
+
+def scrape_table_fast(url, table_id, record_dir=None):
+    """Read the table straight from the page HTML, without starting a browser"""
+    try:
+        print(f"Downloading {url}...")
+        html = fetch_html(url)
+        if html is None:
+            return None
+
+        table_html = extract_table_html(html, table_id)
+        if table_html is None:
+            print(f"Table {table_id} not found in the page HTML")
+            return None
+
+        if record_dir:
+            save_recorded_page(record_dir, url, html)
+
+        return parse_table_html(table_html)
+
+    except Exception as e:
+        print(f"Error parsing {url}: {str(e)}")
+        return None
+
+
+def scrape_table_with_selenium(url, table_id, driver, timeout=20, record_dir=None):
+    try:
+        print(f"Scraping {url} with the browser...")
+        driver.get(url)
+
+        # Wait until the table is in the DOM instead of sleeping a fixed time
+        table = wait_for_element(driver, By.ID, table_id, timeout=timeout)
+        html = table.get_attribute('outerHTML')
+
+        # Cache the rendered page, so the next run finds the table without a browser
+        response_cache.store(url, driver.page_source)
+        if record_dir:
+            save_recorded_page(record_dir, url, driver.page_source)
+
+        return parse_table_html(html)
+
+    except Exception as e:
+        print(f"Error scraping {url}: {str(e)}")
+        return None
+
+
+# Standardize column names to avoid issues with special characters
+def standardize_column_names(df):
+    df.columns = df.columns.str.replace(r'%', 'pct', regex=True)
+    df.columns = df.columns.str.replace(r'[^a-zA-Z0-9_]', '_', regex=True)
+    df.columns = df.columns.str.replace(r'_+', '_', regex=True)
+    df.columns = df.columns.str.strip('_')
+    return df
+
+
+def prepare_table(df, table_id, keep=None):
+    """Standardize one scraped table: Player/Squad columns, clean names, optional column projection"""
+    # Find and standardize player column
+    player_col = next((col for col in df.columns if 'player' in col.lower()), None)
+    if not player_col:
+        print(f"Skipping {table_id} - no player column found")
+        return None
+
+    df = df.rename(columns={player_col: 'Player'})
+    df['Player'] = df['Player'].str.replace(r'^\d+\s*', '', regex=True).str.strip()
+
+    # Find and standardize squad column if available
+    squad_col = next((col for col in df.columns if 'squad' in col.lower() or 'team' in col.lower()), None)
+    if squad_col:
+        df = df.rename(columns={squad_col: 'Squad'})
+
+    df = standardize_column_names(df)
+    df = df.loc[:, ~df.columns.duplicated()]
+
+    # Drop everything the final dataset does not use right away
+    if keep is not None:
+        df = df[[col for col in df.columns if col in KEY_COLUMNS or col in keep]]
+
+    return df
+
+
+def table_key(df, with_squad=True):
+    """Normalized (Player, Squad) join key of a table"""
+    player = df['Player'].astype(str).str.replace(r'\s+', ' ', regex=True).str.strip().str.casefold()
+    if not with_squad:
+        return pd.Index(player, name='Player')
+    squad = df['Squad'].astype(str).str.strip().str.casefold()
+    return pd.MultiIndex.from_arrays([player, squad], names=KEY_COLUMNS)
+
+
+def join_tables(main_df, other_tables, columns_to_keep):
+    """Left-join the other tables onto main_df on the normalized key, in one concatenation.
+
+    A column is taken from the first table that has it, as the old merge with
+    '_drop' suffixes did, and only the columns in columns_to_keep are joined."""
+    wanted = [col for col in columns_to_keep if col not in KEY_COLUMNS]
+    main_has_squad = 'Squad' in main_df.columns
+    main_key = table_key(main_df, main_has_squad)
+    main_player_key = table_key(main_df, with_squad=False)
+
+    taken = set()
+    parts = [main_df[[col for col in KEY_COLUMNS if col in main_df.columns]]]
+    for position, df in enumerate([main_df] + list(other_tables)):
+        cols = [col for col in wanted if col in df.columns and col not in taken]
+        if not cols:
+            continue
+        taken.update(cols)
+
+        if position == 0:
+            parts.append(df[cols])
+            continue
+
+        # Tables without a squad column are matched on the player name alone
+        with_squad = main_has_squad and 'Squad' in df.columns
+        part = df[cols].set_axis(table_key(df, with_squad), axis=0)
+        part = part[~part.index.duplicated()]
+        part = part.reindex(main_key if with_squad else main_player_key)
+        part.index = main_df.index
+        parts.append(part)
+
+    return pd.concat(parts, axis=1)
@@ -0,0 +1,185 @@
+import os
+import json
+import glob
+
+import numpy as np
+import pandas as pd
+
+from player_data import RESULTS_CSV, load_player_matrix
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FEATURE_DIR = os.path.join(BASE_DIR, "feature_matrix")
+PARTITION_DIR = os.path.join(BASE_DIR, "partitions")
+
+# Rows are ordered by these columns, so every squad of a season (and every position
+# within a squad) is one contiguous block of rows; order.npy maps them back to the files
+GROUP_COLUMNS = ['League', 'Season', 'Squad', 'Position']
+
+
+def partition_sources(partition_dir=PARTITION_DIR):
+    """Every league-season results file written by Problem I"""
+    return sorted(glob.glob(os.path.join(partition_dir, '*', '*', 'results.csv')))
+
+
+def _source_labels(path):
+    """(league, season) of a partition file, empty strings for any other file"""
+    relative = os.path.relpath(os.path.abspath(path), PARTITION_DIR).split(os.sep)
+    if len(relative) == 3 and relative[0] != '..':
+        return relative[0], relative[1]
+    return '', ''
+
+
+def _group_keys(meta):
+    return meta[GROUP_COLUMNS].astype(object).where(meta[GROUP_COLUMNS].notna(), '')
+
+
+def _save_array(path, array):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def build_feature_matrix(sources=None, directory=FEATURE_DIR, dtype=np.float32):
+    """Write the players x stats matrix of the given results files to `directory`.
+
+    Produces raw.npy (NaN for missing values), scaled.npy (mean-imputed and standardized
+    like SimpleImputer + StandardScaler), both stored as dtype, meta.csv with one row of
+    player info per matrix row, order.npy with the row of the concatenated results files
+    every matrix row comes from, and index.json with the column index, the contiguous
+    row range of every (league, season, squad, position) group and the scaling
+    parameters. The scaling parameters are computed in float64 before the rows are
+    reordered. Stats that are missing for every player are left out, as SimpleImputer does."""
+    sources = [RESULTS_CSV] if sources is None else list(sources)
+    metas, frames = [], []
+    for path in sources:
+        meta, stats = load_player_matrix(path)
+        meta = meta.copy()
+        meta['League'], meta['Season'] = _source_labels(path)
+        metas.append(meta)
+        frames.append(stats)
+
+    meta = pd.concat(metas, ignore_index=True)
+    stats = pd.concat(frames, ignore_index=True)
+    stats = stats.loc[:, stats.notna().any()]
+
+    raw = stats.to_numpy(dtype=np.float64)
+    mean = np.nanmean(raw, axis=0)
+    filled = np.where(np.isnan(raw), mean, raw)
+    scale = filled.std(axis=0)
+    scale[scale == 0] = 1.0
+    scaled = (filled - mean) / scale
+
+    order = _group_keys(meta).sort_values(GROUP_COLUMNS, kind='mergesort').index.to_numpy()
+    meta = meta.iloc[order].reset_index(drop=True)
+
+    os.makedirs(directory, exist_ok=True)
+    _save_array(os.path.join(directory, 'raw.npy'), raw[order].astype(dtype))
+    _save_array(os.path.join(directory, 'scaled.npy'), scaled[order].astype(dtype))
+    _save_array(os.path.join(directory, 'order.npy'), order)
+    meta.to_csv(os.path.join(directory, 'meta.csv'), index=False)
+
+    keys = _group_keys(meta)
+    starts = np.flatnonzero((keys != keys.shift()).any(axis=1).to_numpy())
+    stops = np.append(starts[1:], len(keys))
+    groups = [list(keys.iloc[start]) + [int(start), int(stop)] for start, stop in zip(starts, stops)]
+
+    index = {
+        'sources': {os.path.abspath(path): os.path.getmtime(path) for path in sources},
+        'dtype': np.dtype(dtype).name,
+        'columns': list(stats.columns),
+        'player_ids': [None if pd.isna(player_id) else int(player_id)
+                       for player_id in meta.get('Player_ID', pd.Series([None] * len(meta)))],
+        'groups': groups,
+        'mean': mean.tolist(),
+        'scale': scale.tolist(),
+    }
+    # The index is written last, so a half-written matrix is never picked up
+    tmp_path = os.path.join(directory, 'index.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(directory, 'index.json'))
+    return directory
+
+
+def is_stale(sources=None, directory=FEATURE_DIR, dtype=np.float32):
+    """True when the matrix is missing or was built from other or older files, or as another dtype"""
+    sources = [RESULTS_CSV] if sources is None else list(sources)
+    index_path = os.path.join(directory, 'index.json')
+    if not os.path.exists(index_path):
+        return True
+    with open(index_path, encoding='utf-8') as f:
+        index = json.load(f)
+    current = {os.path.abspath(path): os.path.getmtime(path) for path in sources}
+    return index['sources'] != current or index.get('dtype') != np.dtype(dtype).name
+
+
+class FeatureMatrix:
+    """Read-only, memory-mapped view of a matrix written by build_feature_matrix.
+
+    raw and scaled are np.memmap arrays of shape (players, stats) with the rows grouped
+    by squad and position. The pages are shared by every process that opens the same
+    files, and slicing a group of rows returns a view, not a copy. order[i] is the row
+    of the results files that matrix row i holds, and indexing with inverse puts the
+    rows back in file order (a copy), e.g. scaled[inverse]."""
+
+    def __init__(self, directory=FEATURE_DIR):
+        self.directory = directory
+        with open(os.path.join(directory, 'index.json'), encoding='utf-8') as f:
+            index = json.load(f)
+        self.columns = index['columns']
+        self.player_ids = pd.array(index['player_ids'], dtype='Int64')
+        self.groups = index['groups']
+        self.mean = np.array(index['mean'])
+        self.scale = np.array(index['scale'])
+        self.raw = np.load(os.path.join(directory, 'raw.npy'), mmap_mode='r')
+        self.scaled = np.load(os.path.join(directory, 'scaled.npy'), mmap_mode='r')
+        self.order = np.load(os.path.join(directory, 'order.npy'))
+        self.inverse = np.empty_like(self.order)
+        self.inverse[self.order] = np.arange(len(self.order))
+        self._column_index = {col: i for i, col in enumerate(self.columns)}
+        self._meta = None
+
+    @property
+    def meta(self):
+        """Player info, one row per matrix row"""
+        if self._meta is None:
+            self._meta = pd.read_csv(os.path.join(self.directory, 'meta.csv'),
+                                     dtype={'Player_ID': 'Int64', 'League': str, 'Season': str},
+                                     keep_default_na=False, na_values=[''])
+        return self._meta
+
+    def column(self, name):
+        """Position of a stat in the column index"""
+        return self._column_index[name]
+
+    def rows(self, league=None, season=None, squad=None, position=None):
+        """Rows of the players matching every given label.
+
+        A slice when they form one block, which is always the case for a squad or a
+        position within a squad of one season; an index array otherwise."""
+        wanted = [league, season, squad, position]
+        ranges = [(start, stop) for *labels, start, stop in self.groups
+                  if all(want is None or want == label for want, label in zip(wanted, labels))]
+        merged = []
+        for start, stop in ranges:
+            if merged and merged[-1][1] == start:
+                merged[-1][1] = stop
+            else:
+                merged.append([start, stop])
+        if len(merged) == 1:
+            return slice(*merged[0])
+        return np.concatenate([np.arange(start, stop) for start, stop in merged] or [np.empty(0, dtype=int)])
+
+    def frame(self, which='raw', rows=slice(None)):
+        """The rows of the raw or scaled matrix as a DataFrame (a copy)"""
+        values = self.raw if which == 'raw' else self.scaled
+        return pd.DataFrame(np.array(values[rows], dtype=np.float64), columns=self.columns)
+
+
+def load_feature_matrix(sources=None, directory=FEATURE_DIR, dtype=np.float32):
+    """The feature matrix of the given results files, rebuilt first if it is stale"""
+    if is_stale(sources, directory, dtype):
+        print(f"Building the feature matrix in {directory}")
+        build_feature_matrix(sources, directory, dtype)
+    return FeatureMatrix(directory)
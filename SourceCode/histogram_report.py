@@ -0,0 +1,95 @@
+import os
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORT_DIR = os.path.join(BASE_DIR, "histograms")
+
+GRID_COLUMNS = 5
+
+
+def compute_histograms(meta, stats, stat_names, by='Squad', bins=30):
+    """Histograms of every stat, overall and per group, on bin edges shared by all groups.
+
+    For each stat the counts of every group come out of a single np.bincount over
+    (group, bin) pairs. Returns {stat: (edges, overall counts, group counts)} and the
+    sorted group labels; group counts have one row per label."""
+    labels = meta[by].astype(object)
+    groups = sorted(labels.dropna().unique().tolist())
+    codes = labels.map({group: code for code, group in enumerate(groups)}).fillna(-1).to_numpy(dtype=int)
+
+    histograms = {}
+    for stat in stat_names:
+        values = stats[stat].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(values)
+        edges = np.histogram_bin_edges(values[valid], bins=bins) if valid.any() else np.linspace(0, 1, bins + 1)
+        # Same convention as np.histogram: the last bin includes its right edge
+        bin_index = np.clip(np.searchsorted(edges, values[valid], side='right') - 1, 0, bins - 1)
+        overall = np.bincount(bin_index, minlength=bins)
+
+        in_group = codes[valid] >= 0
+        flat = codes[valid][in_group] * bins + bin_index[in_group]
+        per_group = np.bincount(flat, minlength=len(groups) * bins).reshape(len(groups), bins)
+        histograms[stat] = (edges, overall, per_group)
+    return histograms, groups
+
+
+def render_stat_grid(stat, edges, overall, per_group, groups, output_dir=REPORT_DIR, formats=('png',),
+                     overall_label='All players'):
+    """One figure of small multiples for a stat: all players first, then every group"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    panels = [(overall_label, overall)] + list(zip(groups, per_group))
+    n_rows = math.ceil(len(panels) / GRID_COLUMNS)
+    fig, axes = plt.subplots(n_rows, GRID_COLUMNS, figsize=(4 * GRID_COLUMNS, 3 * n_rows),
+                             sharex=True, squeeze=False)
+    widths = np.diff(edges)
+    for ax, (label, counts) in zip(axes.flat, panels):
+        ax.bar(edges[:-1], counts, width=widths, align='edge', color='blue', edgecolor='black')
+        ax.set_title(str(label), fontsize=9)
+        ax.grid(True)
+    for ax in axes.flat[len(panels):]:
+        ax.set_visible(False)
+    fig.suptitle(f'Histogram of {stat}')
+    fig.supxlabel(stat)
+    fig.supylabel('Frequency')
+    fig.tight_layout()
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(output_dir, f'{stat}.{fmt}')
+        fig.savefig(path, dpi=100)
+        paths.append(path)
+    plt.close(fig)
+    return paths
+
+
+def _render(args):
+    return render_stat_grid(*args)
+
+
+def render_report(meta, stats, stat_names, output_dir=REPORT_DIR, by='Squad', bins=30, formats=('png',),
+                  workers=None):
+    """Compute every histogram and render one small-multiple grid per stat, without a display.
+
+    Figures are drawn with the Agg backend in worker processes (workers=1 draws them in
+    this process). Returns the written file paths."""
+    histograms, groups = compute_histograms(meta, stats, stat_names, by=by, bins=bins)
+    tasks = [(stat, edges, overall, per_group, groups, output_dir, tuple(formats))
+             for stat, (edges, overall, per_group) in histograms.items()]
+
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    if workers == 1:
+        results = [_render(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_render, tasks))
+    paths = [path for result in results for path in result]
+    print(f"Wrote {len(paths)} histogram files to {output_dir}")
+    return paths
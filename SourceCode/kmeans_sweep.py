@@ -0,0 +1,102 @@
+import os
+import pickle
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.cluster import KMeans
+
+from silhouette import DEFAULT_SAMPLE_SIZE, silhouette
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, ".kmeans_cache")
+
+# Data of each worker process, filled in by _init_worker
+_worker = {}
+
+
+def _init_worker(data, single_thread=False):
+    _worker['data'] = data
+    if single_thread:
+        # One k per process; letting every process also start a full thread pool oversubscribes the cores
+        from threadpoolctl import threadpool_limits
+        _worker['thread_limit'] = threadpool_limits(limits=1)
+
+
+def data_hash(data):
+    """Hash of an array's shape, dtype and values"""
+    data = np.ascontiguousarray(data)
+    digest = hashlib.sha1(f'{data.shape}{data.dtype}'.encode())
+    digest.update(data.tobytes())
+    return digest.hexdigest()
+
+
+def _cache_path(cache_dir, digest, k, params, scoring):
+    key = hashlib.sha1(f'{digest}|{k}|{sorted(params.items())}|{sorted(scoring.items())}'.encode()).hexdigest()
+    return os.path.join(cache_dir, f'k{k}-{key}.pkl')
+
+
+def fit_k(k, params, scoring):
+    """Fit one KMeans model and score it: inertia, and the silhouette for k >= 2"""
+    data = _worker['data']
+    model = KMeans(n_clusters=k, init='k-means++', **params)
+    labels = model.fit_predict(data)
+    score = silhouette(data, labels, centers=model.cluster_centers_, **scoring) if 1 < k < len(data) else None
+    return {'k': k, 'model': model, 'labels': labels, 'inertia': model.inertia_, 'silhouette': score}
+
+
+def _fit_and_store(k, params, scoring, path):
+    result = fit_k(k, params, scoring)
+    if path is not None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(result, f)
+        os.replace(tmp_path, path)
+    return result
+
+
+def sweep(data, ks=range(1, 11), n_init=50, random_state=42, workers=None, cache_dir=CACHE_DIR,
+          silhouette_method='auto', sample_size=DEFAULT_SAMPLE_SIZE):
+    """Fit KMeans once for every k, in parallel, reusing cached fits.
+
+    Every k is fitted a single time and gives both the inertia (elbow method) and the
+    silhouette score. Results are cached per k under a hash of the data and parameters,
+    so re-running on unchanged data loads them instead of fitting. cache_dir=None turns
+    the cache off. silhouette_method is passed to silhouette.silhouette: 'auto' is exact
+    on small data and a stratified sample of sample_size players on large data.
+    Returns {k: {'model', 'labels', 'inertia', 'silhouette'}}."""
+    data = np.asarray(data)
+    params = {'n_init': n_init, 'random_state': random_state}
+    scoring = {'method': silhouette_method, 'sample_size': sample_size, 'random_state': random_state}
+    digest = data_hash(data)
+
+    results, missing = {}, []
+    for k in ks:
+        path = _cache_path(cache_dir, digest, k, params, scoring) if cache_dir else None
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    results[k] = pickle.load(f)
+                continue
+            except Exception as e:
+                print(f"Ignoring the cached fit for k={k}: {e}")
+        missing.append((k, path))
+
+    if missing:
+        print(f"Fitting KMeans for k={', '.join(str(k) for k, _ in missing)}")
+        workers = min(workers or os.cpu_count() or 1, len(missing))
+        if workers == 1:
+            _init_worker(data)
+            fitted = [_fit_and_store(k, params, scoring, path) for k, path in missing]
+        else:
+            # Largest k first, they take longest
+            order = sorted(missing, key=lambda item: -item[0])
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(data, True)) as executor:
+                fitted = list(executor.map(_fit_and_store, [k for k, _ in order], [params] * len(order),
+                                           [scoring] * len(order), [path for _, path in order]))
+        for result in fitted:
+            results[result['k']] = result
+
+    return {k: results[k] for k in ks}
@@ -0,0 +1,158 @@
+import io
+import csv
+import json
+
+import numpy as np
+import pandas as pd
+
+PLAYER_COLUMNS = ['Player', 'Squad', 'Nation', 'Position']
+BUFFER_SIZE = 1 << 16
+
+
+def select_top_k(values, k, largest=True, ties='first'):
+    """Boolean mask of the k best rows of every column of a 2D array, ignoring NaN.
+
+    Uses a partial selection (np.partition) to find the k-th best value of every column
+    at once. With ties='first' rows that tie with the k-th value are taken in row order
+    until there are k, like nlargest/nsmallest; with ties='all' all of them are kept."""
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    # Best values first in ascending order, missing values last
+    keyed = np.where(valid, -values if largest else values, np.inf)
+
+    n_rows = keyed.shape[0]
+    if n_rows == 0 or k <= 0:
+        return np.zeros(keyed.shape, dtype=bool)
+    kth = min(k, n_rows) - 1
+    threshold = np.partition(keyed, kth, axis=0)[kth]
+
+    better = keyed < threshold
+    equal = (keyed == threshold) & valid
+    if ties == 'all':
+        return better | equal
+    if ties != 'first':
+        raise ValueError("ties must be 'first' or 'all'")
+    room = k - better.sum(axis=0)
+    return better | (equal & (np.cumsum(equal, axis=0) <= room))
+
+
+def _column_boards(meta, values, labels, columns, k, ties, group):
+    """Long-format rows of the top and bottom k of every column of one group"""
+    parts = []
+    for direction, largest in (('highest', True), ('lowest', False)):
+        mask = select_top_k(values, k, largest, ties)
+        rows, cols = np.nonzero(mask)
+        picked = values[rows, cols]
+
+        # Best first within every statistic, ties in row order
+        order = np.lexsort((rows, -picked if largest else picked, cols))
+        rows, cols, picked = rows[order], cols[order], picked[order]
+        shown = labels[rows, cols]
+
+        # Competition ranking: 1 + number of selected players strictly better in the same stat
+        better = -picked if largest else picked
+        starts = np.searchsorted(cols, np.arange(values.shape[1]))
+        rank = np.empty(len(rows), dtype=int)
+        for col, start in enumerate(starts):
+            stop = starts[col + 1] if col + 1 < len(starts) else len(rows)
+            rank[start:stop] = np.searchsorted(better[start:stop], better[start:stop], side='left') + 1
+
+        part = meta.iloc[rows].reset_index(drop=True)
+        part.insert(0, 'Rank', rank)
+        part.insert(0, 'Direction', direction)
+        part.insert(0, 'Statistic', np.asarray(columns, dtype=object)[cols])
+        part.insert(0, 'Group', group)
+        part['Value'] = shown
+        parts.append(part)
+    return parts
+
+
+def leaderboards(meta, stats, k=3, ties='first', group_by=None, labels=None):
+    """Top and bottom k players of every statistic, overall or per group.
+
+    meta holds the player columns and stats the numeric matrix (same rows), as returned
+    by player_data.load_player_matrix. group_by is None, 'Squad' or 'Position' (any meta
+    column works). Returns one row per selected player with Group, Statistic, Direction
+    ('highest' or 'lowest'), Rank, the player columns and Value.
+
+    Value is the stat as stored in stats, or the entry of labels when given: a frame
+    with the same rows and columns, e.g. the CSV as pandas reads it."""
+    player_columns = [col for col in PLAYER_COLUMNS if col in meta.columns]
+    meta = meta[player_columns].reset_index(drop=True)
+    values = stats.to_numpy(dtype=np.float64)
+    labels = (stats if labels is None else labels[stats.columns]).to_numpy(dtype=object)
+    columns = list(stats.columns)
+
+    parts = []
+    if group_by is None:
+        parts += _column_boards(meta, values, labels, columns, k, ties, 'All')
+    else:
+        codes, groups = pd.factorize(meta[group_by], sort=True)
+        for code, group in enumerate(groups):
+            rows = np.flatnonzero(codes == code)
+            parts += _column_boards(meta.iloc[rows], values[rows], labels[rows], columns, k, ties, group)
+
+    if not parts:
+        return pd.DataFrame(columns=['Group', 'Statistic', 'Direction', 'Rank'] + player_columns + ['Value'])
+    board = pd.concat(parts, ignore_index=True)
+    # Statistics in their original column order, highest before lowest
+    stat_order = {col: i for i, col in enumerate(columns)}
+    board = board.sort_values(['Group', 'Statistic', 'Direction', 'Rank'],
+                              key=lambda s: s.map(stat_order) if s.name == 'Statistic' else s,
+                              kind='mergesort')
+    return board.reset_index(drop=True)
+
+
+def format_value(value):
+    """A leaderboard value as text, "N/a" when missing"""
+    if pd.isna(value):
+        return "N/a"
+    return str(value)
+
+
+def write_text(board, path, k=3):
+    """The top_3.txt layout: one section per statistic (and group) with both lists"""
+    grouped = board['Group'].nunique() > 1 or (len(board) and board['Group'].iloc[0] != 'All')
+    with io.open(path, 'w', encoding='utf-8', buffering=BUFFER_SIZE) as f:
+        for (group, stat), section in board.groupby(['Group', 'Statistic'], sort=False):
+            f.write(f"\n=== {group}: {stat} ===\n" if grouped else f"\n=== {stat} ===\n")
+            for direction in ('highest', 'lowest'):
+                if direction == 'lowest':
+                    f.write("\n")
+                f.write(f"Top {k} {direction} statistics:\n")
+                rows = section[section['Direction'] == direction]
+                for player, squad, nation, position, value in zip(
+                        rows['Player'], rows['Squad'], rows['Nation'], rows['Position'], rows['Value']):
+                    f.write(f"{player} (Team:{squad}, Nation:{nation}, Position:{position}): "
+                            f"{format_value(value)}\n")
+            # Extra spacing between statistics
+            f.write("\n\n")
+
+
+def write_csv(board, path):
+    with io.open(path, 'w', encoding='utf-8-sig', newline='', buffering=BUFFER_SIZE) as f:
+        writer = csv.writer(f)
+        writer.writerow(board.columns)
+        writer.writerows(board.itertuples(index=False, name=None))
+
+
+def write_json(board, path):
+    records = board.astype(object).where(board.notna(), None).to_dict(orient='records')
+    with io.open(path, 'w', encoding='utf-8', buffering=BUFFER_SIZE) as f:
+        json.dump(records, f, ensure_ascii=False, indent=1)
+
+
+def write_leaderboard(board, path, fmt=None, k=3):
+    """Write a leaderboard as text, csv or json; the format defaults to the file extension"""
+    fmt = fmt or path.rsplit('.', 1)[-1].lower()
+    if fmt == 'txt':
+        fmt = 'text'
+    if fmt == 'text':
+        write_text(board, path, k)
+    elif fmt == 'csv':
+        write_csv(board, path)
+    elif fmt == 'json':
+        write_json(board, path)
+    else:
+        raise ValueError(f"Unknown leaderboard format: {fmt}")
+    return path
@@ -0,0 +1,58 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Euros per unit of each currency; update when the rates drift
+EUR_RATES = {
+    '€': 1.0, 'EUR': 1.0,
+    '£': 1.17, 'GBP': 1.17,
+    '$': 0.92, 'USD': 0.92,
+}
+
+SUFFIXES = {'': 1.0, 'K': 1e3, 'M': 1e6, 'B': 1e9, 'BN': 1e9}
+
+# Currency before or after the amount, optional thousands separators and K/M/B suffix
+_MONEY_PATTERN = (r'^\s*(?P<currency>[€£$]|EUR|GBP|USD)?\s*'
+                  r'(?P<amount>\d[\d,]*(?:\.\d+)?)\s*'
+                  r'(?P<suffix>bn|[KMB])?\s*'
+                  r'(?P<currency_after>[€£$]|EUR|GBP|USD)?\s*$')
+
+
+def parse_money(values, unit=1e6, rates=EUR_RATES, default_currency='€'):
+    """Parse strings like '€17.7M', '€850K' or '£1.2bn' into floats, in one pass over the column.
+
+    The result is in euros divided by `unit` (millions by default); missing or
+    unreadable values become NaN, and so do bare numbers like '17.7', which have
+    neither a currency nor a K/M/B suffix to tell the unit. Values that are already
+    numbers are returned as is."""
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+
+    parts = values.astype(str).str.extract(_MONEY_PATTERN, flags=re.IGNORECASE)
+    amount = pd.to_numeric(parts['amount'].str.replace(',', '', regex=False), errors='coerce')
+    has_unit = parts[['currency', 'suffix', 'currency_after']].notna().any(axis=1)
+    # Combined on object arrays: fillna on an all-missing object column would be downcast
+    currency = parts['currency'].to_numpy(dtype=object)
+    currency = np.where(pd.isna(currency), parts['currency_after'].to_numpy(dtype=object), currency)
+    currency = np.where(pd.isna(currency), default_currency, currency)
+    rate = pd.Series(currency, index=parts.index, dtype=object).str.upper().map(rates).astype(float)
+    multiplier = parts['suffix'].fillna('').str.upper().map(SUFFIXES).astype(float)
+    return (amount * multiplier * rate / unit).where(has_unit).astype(float)
+
+
+def format_money(values, unit=1e6, symbol='€', suffix=None):
+    """Inverse of parse_money for display: 17.7 -> '€17.7M', 0.85 -> '€850K', NaN stays NaN.
+
+    suffix=None writes amounts below a million with K and the others with M;
+    'K', 'M' or 'B' forces one suffix for every value."""
+    euros = pd.Series(values, dtype=float) * unit
+    if suffix is None:
+        suffixes = pd.Series(np.where(euros.abs() >= 1e6, 'M', 'K'), index=euros.index)
+    else:
+        suffixes = pd.Series(suffix, index=euros.index)
+    scaled = euros / suffixes.map(SUFFIXES)
+    text = symbol + scaled.round(1).map('{:g}'.format) + suffixes
+    text = np.where(euros.notna(), text.to_numpy(dtype=object), np.nan)
+    return pd.Series(text, index=euros.index, dtype=object)
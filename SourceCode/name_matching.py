@@ -0,0 +1,144 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+
+def normalize_name(name):
+    """Lowercase, accent-free, punctuation-free name with its words sorted"""
+    if pd.isna(name):
+        return ""
+    name = str(name).split('\n')[0]
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c for c in name if not unicodedata.combining(c)).lower()
+    name = re.sub(r'[^a-z]+', ' ', name)
+    return ' '.join(sorted(name.split()))
+
+
+def _top_two(scores):
+    """Column and value of the best and second-best entry in every row of a sparse matrix"""
+    scores = scores.tocsr()
+    n_rows = scores.shape[0]
+    counts = np.diff(scores.indptr)
+
+    # Sort the stored entries by row, highest score first within a row
+    rows = np.repeat(np.arange(n_rows), counts)
+    order = np.lexsort((-scores.data, rows))
+    cols = scores.indices[order]
+    values = scores.data[order]
+    first = scores.indptr[:-1]
+
+    best_col = np.full(n_rows, -1)
+    best_val = np.zeros(n_rows, dtype=np.float32)
+    second_col = np.full(n_rows, -1)
+    second_val = np.zeros(n_rows, dtype=np.float32)
+
+    has_one = counts >= 1
+    best_col[has_one] = cols[first[has_one]]
+    best_val[has_one] = values[first[has_one]]
+    has_two = counts >= 2
+    second_col[has_two] = cols[first[has_two] + 1]
+    second_val[has_two] = values[first[has_two] + 1]
+    return best_col, best_val, second_col, second_val
+
+
+class NameMatcher:
+    """Fuzzy lookup of names against a fixed list of candidate names.
+
+    Names are turned into TF-IDF weighted character trigrams. The blocking index
+    maps trigrams to the candidates containing them, leaving out the common
+    trigrams (" da", "ez ", ...) that appear in more than max_df of the candidates
+    (and in more than min_pruned_df of them, so short lists are never pruned).
+    Every name keeps at least its min_keys rarest trigrams, so no name drops out of
+    the index. A query is only scored against the candidates it shares a blocking
+    trigram with, and the score is the cosine similarity of the full trigram vectors.
+
+    Candidates can be added later with add(), which extends the index without
+    refitting the trigram weights until the list has doubled since the last fit."""
+
+    def __init__(self, candidates, min_score=0.6, ambiguity_margin=0.05, ngram_range=(3, 3),
+                 max_df=0.002, min_pruned_df=20, min_keys=4):
+        self.candidates = pd.Series(list(candidates), dtype=object)
+        self.min_score = min_score
+        self.ambiguity_margin = ambiguity_margin
+        self.max_df = max_df
+        self.min_pruned_df = min_pruned_df
+        self.min_keys = min_keys
+        self._vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=ngram_range,
+                                           preprocessor=normalize_name, dtype=np.float32)
+        self._fit()
+
+    def _fit(self):
+        self._vectors = self._vectorizer.fit_transform(self.candidates).tocsr()
+        self._df = np.bincount(self._vectors.indices, minlength=self._vectors.shape[1])
+        self._max_block_df = max(self.max_df * len(self.candidates), self.min_pruned_df)
+        self._index = self._block_keys(self._vectors).T.tocsr()
+        self._fitted_size = len(self.candidates)
+
+    def _block_keys(self, vectors):
+        """0/1 matrix of the trigrams every name is blocked on: the rare ones, and at least its min_keys rarest"""
+        counts = np.diff(vectors.indptr)
+        rows = np.repeat(np.arange(vectors.shape[0]), counts)
+        df = self._df[vectors.indices]
+        # Rank of every trigram within its name, rarest first
+        order = np.lexsort((df, rows))
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order)) - np.repeat(vectors.indptr[:-1], counts)
+        keep = (df <= self._max_block_df) | (rank < self.min_keys)
+        return sp.csr_matrix((np.ones(keep.sum(), dtype=np.float32), (rows[keep], vectors.indices[keep])),
+                             shape=vectors.shape)
+
+    def add(self, names):
+        """Append candidates; new names are indexed with the trigram weights fitted so far"""
+        names = pd.Series(list(names), dtype=object)
+        if names.empty:
+            return
+        self.candidates = pd.concat([self.candidates, names], ignore_index=True)
+        if len(self.candidates) > 2 * self._fitted_size:
+            self._fit()
+        else:
+            vectors = self._vectorizer.transform(names).tocsr()
+            self._vectors = sp.vstack([self._vectors, vectors], format='csr')
+            self._index = sp.hstack([self._index, self._block_keys(vectors).T], format='csr')
+
+    def _scores(self, queries):
+        """Sparse queries x candidates cosine similarities of the pairs sharing a blocking trigram"""
+        pairs = (self._block_keys(queries) @ self._index).tocoo()
+        rows, cols = pairs.row, pairs.col
+        scores = np.asarray(queries[rows].multiply(self._vectors[cols]).sum(axis=1)).ravel()
+        return sp.csr_matrix((scores, (rows, cols)), shape=pairs.shape)
+
+    def match(self, queries, batch_size=1000):
+        """Best candidate for every query.
+
+        Returns one row per query with Query, Match, Match_Index (-1 when no candidate
+        reaches min_score), Score, Runner_Up, Runner_Up_Score and Ambiguous, which is
+        set when the runner-up scores within ambiguity_margin of the best match."""
+        queries = pd.Series(list(queries), dtype=object)
+        query_matrix = self._vectorizer.transform(queries).tocsr()
+
+        parts = [_top_two(self._scores(query_matrix[start:start + batch_size]))
+                 for start in range(0, len(queries), batch_size)]
+        if parts:
+            best_col, best_val, second_col, second_val = (np.concatenate(arrays) for arrays in zip(*parts))
+        else:
+            best_col = second_col = np.empty(0, dtype=int)
+            best_val = second_val = np.empty(0, dtype=np.float32)
+
+        found = (best_col >= 0) & (best_val >= self.min_score)
+        best_col = np.where(found, best_col, -1)
+        ambiguous = found & (second_col >= 0) & (best_val - second_val < self.ambiguity_margin)
+
+        names = self.candidates.to_numpy()
+        return pd.DataFrame({
+            'Query': queries.to_numpy(),
+            'Match': np.where(found, names[np.maximum(best_col, 0)], None),
+            'Match_Index': best_col,
+            'Score': np.round(best_val, 3),
+            'Runner_Up': np.where(second_col >= 0, names[np.maximum(second_col, 0)], None),
+            'Runner_Up_Score': np.round(second_val, 3),
+            'Ambiguous': ambiguous,
+        })
@@ -0,0 +1,144 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_CSV = os.path.join(BASE_DIR, "results.csv")
+
+# Bump when the layout of the typed store changes; older stores are then ignored
+SCHEMA_VERSION = 1
+
+MISSING = "N/a"
+TEXT_COLUMNS = ['Player', 'Age', 'ETV']  # Age stays "years-days", ETV stays the raw money string
+CATEGORY_COLUMNS = ['Nation', 'Squad', 'Position']
+ID_COLUMNS = ['Player_ID']
+
+# Prepared (meta, stats) pairs of this process, keyed by file and modification time
+_prepared = {}
+
+
+def store_path_for(csv_path):
+    """The typed Arrow store that sits next to a CSV output"""
+    return os.path.splitext(csv_path)[0] + '.arrow'
+
+
+def type_results(df):
+    """Typed copy of a results frame: real nulls, categorical text columns, numeric stats"""
+    df = df.replace(MISSING, np.nan)
+    stat_cols = [col for col in df.columns if col not in TEXT_COLUMNS + CATEGORY_COLUMNS + ID_COLUMNS]
+    df[stat_cols] = df[stat_cols].apply(pd.to_numeric, errors='coerce')
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in ID_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+    return df
+
+
+def write_results_store(df, csv_path=RESULTS_CSV):
+    """Write the typed Arrow (Feather v2) copy of a CSV output, next to it.
+
+    The file is uncompressed and missing stats are stored as NaN rather than Arrow
+    nulls, so numeric columns can be memory-mapped and handed to pandas without a copy."""
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        print("pyarrow is not installed, skipping the typed results store")
+        return None
+
+    df = type_results(df)
+    arrays = []
+    for col in df.columns:
+        values = df[col]
+        if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'iuf':
+            arrays.append(pa.array(values.to_numpy(), from_pandas=False))
+        else:
+            arrays.append(pa.array(values, from_pandas=True))
+    table = pa.Table.from_arrays(arrays, names=list(df.columns),
+                                 metadata={b'schema_version': str(SCHEMA_VERSION).encode()})
+
+    store_path = store_path_for(csv_path)
+    feather.write_feather(table, store_path, compression='uncompressed')
+    return store_path
+
+
+def _read_store(store_path):
+    import pyarrow.feather as feather
+
+    table = feather.read_table(store_path, memory_map=True)
+    version = (table.schema.metadata or {}).get(b'schema_version')
+    if version != str(SCHEMA_VERSION).encode():
+        print(f"Ignoring {store_path}: schema version {version} instead of {SCHEMA_VERSION}")
+        return None
+    df = table.to_pandas(split_blocks=True)
+    for col in ID_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('Int64')
+    return df
+
+
+def load_results(csv_path=RESULTS_CSV):
+    """A results file as a typed frame, for every analysis stage.
+
+    Reads the memory-mapped Arrow store next to the CSV when it exists and is not
+    older than the CSV, and falls back to parsing the CSV otherwise."""
+    store_path = store_path_for(csv_path)
+    if os.path.exists(store_path) and os.path.getmtime(store_path) >= os.path.getmtime(csv_path):
+        try:
+            df = _read_store(store_path)
+            if df is not None:
+                return df
+        except ImportError:
+            pass
+        except Exception as e:
+            print(f"Could not read {store_path}, using the CSV: {e}")
+
+    return type_results(pd.read_csv(csv_path, na_values=[MISSING]))
+
+
+def parse_age(ages, decimals=2):
+    """Vectorized "years-days" to decimal years; plain numbers pass through, anything else is NaN"""
+    ages = pd.Series(ages)
+    if pd.api.types.is_numeric_dtype(ages):
+        return ages.astype(float)
+
+    text = ages.astype(str).str.strip()
+    parts = text.str.split('-', n=1, expand=True).reindex(columns=[0, 1])
+    years = pd.to_numeric(parts[0], errors='coerce')
+    days = pd.to_numeric(parts[1], errors='coerce')
+    age = years.where(parts[1].isna(), years + days / 365)
+    return age.round(decimals) if decimals is not None else age
+
+
+def split_player_frame(df, age_decimals=2):
+    """(meta frame, float64 stat frame) of a typed results frame, Age as decimal years"""
+    non_stat_columns = TEXT_COLUMNS + CATEGORY_COLUMNS + ID_COLUMNS
+    stat_cols = [col for col in df.columns if col == 'Age' or col not in non_stat_columns]
+    meta = df[[col for col in df.columns if col not in stat_cols]]
+
+    stats = df[stat_cols].copy()
+    if 'Age' in stats.columns:
+        stats['Age'] = parse_age(stats['Age'], age_decimals)
+    return meta, stats.astype(np.float64)
+
+
+def load_player_matrix(csv_path=RESULTS_CSV, age_decimals=2):
+    """(meta frame, float stat frame) for a results file, prepared once per process.
+
+    The meta frame holds the text, categorical and ID columns; every other column is
+    converted to float64 in one bulk operation, Age as decimal years rounded to
+    age_decimals (None keeps it unrounded). Both frames are shared between callers, so
+    do not modify them in place."""
+    key = (os.path.abspath(csv_path), os.path.getmtime(csv_path), age_decimals)
+    if key not in _prepared:
+        _prepared[key] = split_player_frame(load_results(csv_path), age_decimals)
+    return _prepared[key]
+
+
+def iter_player_chunks(csv_path, chunk_size=10000, age_decimals=2):
+    """(meta, stats) of a results CSV, chunk_size rows at a time, without reading the whole file"""
+    for chunk in pd.read_csv(csv_path, na_values=[MISSING], chunksize=chunk_size):
+        yield split_player_frame(type_results(chunk), age_decimals)
@@ -0,0 +1,227 @@
+import os
+import json
+from datetime import date
+
+import pandas as pd
+
+from name_matching import NameMatcher, normalize_name
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_PATH = os.path.join(BASE_DIR, "player_registry.json")
+
+# A new spelling is only suggested as a known player above this fuzzy score
+SUGGEST_MIN_SCORE = 0.85
+
+
+def birth_years(ages, reference_date=None):
+    """Birth year of every fbref age ("years-days" on reference_date, today by default).
+
+    Ages without the days part (or missing) give <NA>."""
+    reference = pd.Timestamp(reference_date or date.today())
+    parts = pd.Series(list(ages), dtype=object).astype(str).str.extract(r'^\s*(\d+)-(\d+)\s*$').astype(float)
+    last_birthday = reference - pd.to_timedelta(parts[1], unit='D')
+    return (last_birthday.dt.year - parts[0]).astype('Int64')
+
+
+class PlayerRegistry:
+    """Stable integer IDs for players, shared by every scraper and merge.
+
+    A player is identified by the normalized name together with the birth year, so
+    namesakes get their own IDs while a player keeps one ID across squads and seasons.
+    Every spelling is kept as a variant with the source it came from, and lookups go
+    through a dict keyed by the normalized name, so resolving a known name is O(1).
+
+    Fuzzy matches are never linked on their own: a new spelling that resembles a known
+    one gets a provisional ID and a suggestion, which confirm() merges into the known
+    player and reject() drops."""
+
+    def __init__(self, path=REGISTRY_PATH):
+        self.path = path
+        self.players = {}      # id -> canonical name
+        self.born = {}         # id -> birth year, for the players it is known of
+        self.variants = []     # [name, source, id] for every spelling seen
+        self.suggestions = []  # [name, source, provisional id or None, suggested id, score]
+        self._lookup = {}      # normalized name -> [id, ...], several for namesakes
+        self._seen = set()     # (name, source) pairs already in variants
+        self._matcher = None   # NameMatcher over the normalized names, built on first use
+        self._unindexed = []   # normalized names not in the matcher yet
+        self._next_id = 1
+        self._dirty = False
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        for player_id, (name, born) in data['players'].items():
+            self.players[int(player_id)] = name
+            if born is not None:
+                self.born[int(player_id)] = born
+        self._next_id = max(self.players, default=0) + 1
+        for name, source, player_id in data['variants']:
+            self._add_variant(name, source, player_id)
+        self.suggestions = data.get('suggestions', [])
+        self._dirty = False
+
+    def save(self):
+        if not self._dirty:
+            return
+        data = {
+            'players': {player_id: [name, self.born.get(player_id)] for player_id, name in self.players.items()},
+            'variants': self.variants,
+            'suggestions': self.suggestions,
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def _add_variant(self, name, source, player_id):
+        if (name, source) not in self._seen:
+            self._seen.add((name, source))
+            self.variants.append([name, source, player_id])
+            self._dirty = True
+        key = normalize_name(name)
+        ids = self._lookup.get(key)
+        if ids is None:
+            self._lookup[key] = [player_id]
+            self._unindexed.append(key)
+        elif player_id not in ids:
+            ids.append(player_id)
+
+    def _new_player(self, name, born=None):
+        player_id = self._next_id
+        self._next_id += 1
+        self.players[player_id] = name
+        if born is not None:
+            self.born[player_id] = born
+        self._dirty = True
+        return player_id
+
+    def _candidates(self, key, born=None):
+        """IDs of the known players a normalized name and birth year can refer to.
+
+        The birth year has to match, or be within a year (ages are read on different
+        days), or be unknown for the player; without a birth year every player of
+        that name is a candidate."""
+        ids = self._lookup.get(key, [])
+        if born is None:
+            return list(ids)
+        known = [player_id for player_id in ids if player_id in self.born]
+        exact = [player_id for player_id in known if self.born[player_id] == born]
+        if exact:
+            return exact
+        close = [player_id for player_id in known if abs(self.born[player_id] - born) <= 1]
+        if close:
+            return close
+        return [player_id for player_id in ids if player_id not in self.born]
+
+    def lookup(self, name, born=None):
+        """ID of a known player, None if the name is unknown or belongs to several players"""
+        ids = self._candidates(normalize_name(name), born)
+        return ids[0] if len(ids) == 1 else None
+
+    def link(self, name, source, player_id):
+        """Record `name` from `source` as another spelling of an existing player"""
+        self._add_variant(name, source, player_id)
+
+    def suggest(self, name, source, player_id, score, provisional_id=None):
+        """Keep a possible spelling of player_id until it is confirmed or rejected"""
+        for suggestion in self.suggestions:
+            if suggestion[:2] == [name, source]:
+                return
+        self.suggestions.append([name, source, provisional_id, int(player_id), round(float(score), 3)])
+        self._dirty = True
+
+    def _pop_suggestion(self, name, source):
+        for i, suggestion in enumerate(self.suggestions):
+            if suggestion[:2] == [name, source]:
+                self._dirty = True
+                return self.suggestions.pop(i)
+        raise KeyError(f"No suggestion for {name!r} from {source!r}")
+
+    def confirm(self, name, source):
+        """Accept a suggestion: the spelling (and its provisional player, if any) joins the suggested player"""
+        _, _, provisional_id, player_id, _ = self._pop_suggestion(name, source)
+        self._add_variant(name, source, player_id)
+        if provisional_id is not None and provisional_id in self.players:
+            for variant in self.variants:
+                if variant[2] == provisional_id:
+                    variant[2] = player_id
+                    ids = self._lookup[normalize_name(variant[0])]
+                    ids[:] = list(dict.fromkeys(player_id if i == provisional_id else i for i in ids))
+            self.players.pop(provisional_id)
+            born = self.born.pop(provisional_id, None)
+            if born is not None:
+                self.born.setdefault(player_id, born)
+        return player_id
+
+    def reject(self, name, source):
+        """Drop a suggestion; a provisional player stays a player of its own"""
+        self._pop_suggestion(name, source)
+
+    def pending_suggestions(self):
+        """Suggestions waiting for confirm() or reject(), with the suggested player's name"""
+        pending = pd.DataFrame(self.suggestions, columns=['Name', 'Source', 'Provisional_ID', 'Player_ID', 'Score'])
+        pending.insert(4, 'Player', pending['Player_ID'].map(self.players))
+        return pending
+
+    def _name_matcher(self):
+        """The NameMatcher over every known normalized name, extended with the new ones"""
+        if self._matcher is None:
+            self._matcher = NameMatcher(self._unindexed, min_score=SUGGEST_MIN_SCORE)
+        else:
+            self._matcher.add(self._unindexed)
+        self._unindexed = []
+        return self._matcher
+
+    def resolve(self, names, source, born=None):
+        """IDs for a sequence of names (and birth years, when known), registering new players.
+
+        Names that match no known player get a new ID; when one closely resembles a
+        known spelling, the pair is kept as a suggestion. Names without a birth year
+        that belong to several players get no ID."""
+        names = pd.Series(list(names), dtype=object)
+        born = pd.Series([pd.NA] * len(names) if born is None else list(born), dtype='Int64')
+        pairs = list(zip(names, [None if pd.isna(year) else int(year) for year in born]))
+
+        ids = {}
+        unknown = []
+        for name, year in dict.fromkeys(pairs):
+            key = normalize_name(name)
+            if not key:
+                continue
+            candidates = self._candidates(key, year)
+            if len(candidates) == 1:
+                if year is not None:
+                    self.born.setdefault(candidates[0], year)
+                ids[(name, year)] = candidates[0]
+                self._add_variant(name, source, candidates[0])
+            elif not candidates:
+                unknown.append((name, year, key))
+
+        if unknown:
+            # Fuzzy candidates among the names known before this batch
+            matches = self._name_matcher().match([key for _, _, key in unknown]) if self._lookup else None
+            for i, (name, year, key) in enumerate(unknown):
+                player_id = self._new_player(name, year)
+                ids[(name, year)] = player_id
+                self._add_variant(name, source, player_id)
+                if matches is None or matches['Match_Index'][i] < 0 or matches['Ambiguous'][i]:
+                    continue
+                suggested = self._candidates(matches['Match'][i], year)
+                if len(suggested) == 1 and suggested[0] != player_id:
+                    self.suggest(name, source, suggested[0], matches['Score'][i], provisional_id=player_id)
+
+        return pd.Series([ids.get(pair) for pair in pairs], dtype='Int64')
+
+    def stamp(self, df, source, name_col='Player', id_col='Player_ID', age_col='Age', reference_date=None):
+        """Copy of df with the player ID inserted right after the name column.
+
+        Birth years come from age_col (fbref "years-days" ages read on reference_date)."""
+        df = df.drop(columns=[id_col], errors='ignore')
+        born = birth_years(df[age_col], reference_date) if age_col in df.columns else None
+        ids = self.resolve(df[name_col], source, born).to_numpy()
+        df.insert(df.columns.get_loc(name_col) + 1, id_col, ids)
+        return df
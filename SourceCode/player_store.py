@@ -0,0 +1,139 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+from player_data import CATEGORY_COLUMNS, RESULTS_CSV, load_results
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "players.db")
+
+TABLE = 'players'
+INDEXED_COLUMNS = ['Squad', 'Position', 'Nation', 'Minutes', 'Player_ID']
+
+# Filter operators, used as a suffix on the column name: find(Minutes__gt=900)
+OPERATORS = {
+    'eq': '= ?', 'ne': '!= ?', 'gt': '> ?', 'ge': '>= ?', 'lt': '< ?', 'le': '<= ?',
+    'contains': "LIKE '%' || ? || '%'",
+}
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def build_player_store(csv_path=RESULTS_CSV, db_path=DB_PATH):
+    """Load a results file into a SQLite database with the lookup columns indexed.
+
+    The database is built next to the target and swapped in at the end, so readers
+    never see a half-written file."""
+    df = load_results(csv_path)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(object)
+
+    tmp_path = db_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        df.to_sql(TABLE, connection, index=False)
+        for col in INDEXED_COLUMNS:
+            if col in df.columns:
+                connection.execute(f'CREATE INDEX {_quote("idx_" + col)} ON {TABLE} ({_quote(col)})')
+        connection.execute('CREATE TABLE store_info (source TEXT, source_mtime REAL)')
+        connection.execute('INSERT INTO store_info VALUES (?, ?)',
+                           (os.path.abspath(csv_path), os.path.getmtime(csv_path)))
+        connection.execute('ANALYZE')
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp_path, db_path)
+    return db_path
+
+
+def _is_stale(csv_path, db_path):
+    if not os.path.exists(db_path):
+        return True
+    connection = sqlite3.connect(db_path)
+    try:
+        row = connection.execute('SELECT source, source_mtime FROM store_info').fetchone()
+    except sqlite3.DatabaseError:
+        return True
+    finally:
+        connection.close()
+    return row != (os.path.abspath(csv_path), os.path.getmtime(csv_path))
+
+
+class PlayerStore:
+    """Indexed, on-disk lookups over Problem I's output.
+
+    The database is (re)built from the CSV when it is missing or older than the CSV.
+    Queries only read the matching rows, so nothing is loaded into memory up front."""
+
+    def __init__(self, csv_path=RESULTS_CSV, db_path=DB_PATH):
+        if _is_stale(csv_path, db_path):
+            print(f"Building the player store {db_path}")
+            build_player_store(csv_path, db_path)
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.columns = [row[1] for row in self.connection.execute(f'PRAGMA table_info({TABLE})')]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _column(self, name):
+        if name not in self.columns:
+            raise KeyError(f"Unknown column: {name}")
+        return _quote(name)
+
+    def _where(self, filters):
+        conditions, params = [], []
+        for key, value in filters.items():
+            name, _, op = key.partition('__')
+            column = self._column(name)
+            op = op or 'eq'
+            if op == 'in':
+                values = list(value)
+                conditions.append(f"{column} IN ({', '.join('?' * len(values))})" if values else '0')
+                params.extend(values)
+            elif op in OPERATORS:
+                conditions.append(f'{column} {OPERATORS[op]}')
+                params.append(value)
+            else:
+                raise ValueError(f"Unknown filter operator: {op}")
+        return (' WHERE ' + ' AND '.join(conditions) if conditions else ''), params
+
+    def find(self, columns=None, order_by=None, descending=False, limit=None, **filters):
+        """Players matching every filter, as a DataFrame.
+
+        Filters are column=value for equality, or column__op=value with op one of
+        eq, ne, gt, ge, lt, le, contains and in, for example
+        find(Squad='Arsenal', order_by='Tackles', descending=True, limit=5) or
+        find(Position__contains='MF', Minutes__gt=900). 'contains' cannot use an index."""
+        where, params = self._where(filters)
+        selected = ', '.join(self._column(col) for col in columns) if columns else '*'
+        sql = f'SELECT {selected} FROM {TABLE}' + where
+        if order_by:
+            # Missing values always come last
+            column = self._column(order_by)
+            sql += f' ORDER BY {column} IS NULL, {column} {"DESC" if descending else "ASC"}'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+
+        df = pd.read_sql_query(sql, self.connection, params=params)
+        if 'Player_ID' in df.columns:
+            df['Player_ID'] = df['Player_ID'].astype('Int64')
+        return df
+
+    def count(self, **filters):
+        """Number of players matching the filters"""
+        where, params = self._where(filters)
+        return self.connection.execute(f'SELECT COUNT(*) FROM {TABLE}' + where, params).fetchone()[0]
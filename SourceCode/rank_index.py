@@ -0,0 +1,261 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import threading
+import http.server
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from player_data import RESULTS_CSV, load_player_matrix
+from stat_registry import is_negative_stat
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RANK_DIR = os.path.join(BASE_DIR, "rank_index")
+
+# Bump when the layout of the stored planes changes; every stat is then re-ranked
+INDEX_VERSION = 2
+
+# Groupings every stat is ranked in; a player's position group is their first listed position
+GROUPINGS = ['overall', 'squad', 'position']
+# Planes stored for every grouping: the value, its rank (1 = best, ties share the best rank),
+# the percentile (share of the group the value is at least as good as) and the group size.
+# Best is the highest value, or the lowest for the stats the stat registry marks negative
+PLANES = ['value', 'rank', 'percentile', 'of']
+
+
+def _group_labels(meta):
+    return {
+        'overall': pd.Series('All', index=meta.index, dtype=object),
+        'squad': meta['Squad'].astype(object),
+        'position': meta['Position'].astype(object).str.split(',').str[0],
+    }
+
+
+def _layout_digest(meta, labels):
+    """Hash of everything except the stat values that the ranks depend on"""
+    digest = hashlib.sha1()
+    for series in [meta['Player'], meta.get('Player_ID', meta['Player'])] + [labels[g] for g in GROUPINGS]:
+        digest.update('\x1f'.join(series.astype(str)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _stat_file(stat):
+    return re.sub(r'[^A-Za-z0-9_]', '_', stat) + '.npy'
+
+
+def rank_column(values, labels, lower_is_better=False):
+    """(groupings, planes, players) float64 array of ranks for one stat"""
+    values = pd.Series(values, dtype=float)
+    planes = []
+    for grouping in GROUPINGS:
+        grouped = values.groupby(labels[grouping].to_numpy(), dropna=True)
+        rank = grouped.rank(ascending=lower_is_better, method='min').reindex(values.index)
+        percentile = grouped.rank(ascending=not lower_is_better, pct=True, method='max').reindex(values.index) * 100
+        size = grouped.transform('count').reindex(values.index).where(values.notna())
+        planes.append([values, rank, percentile, size])
+    return np.asarray(planes, dtype=np.float64)
+
+
+def build_rank_index(csv_path=RESULTS_CSV, directory=RANK_DIR):
+    """Write the rank index of a results file, recomputing only the stats that changed.
+
+    Every stat is stored in its own .npy file together with a hash of its values and
+    of the player/group layout, so a refresh rewrites just the columns whose hash moved.
+    Returns the list of stats that were (re)ranked."""
+    meta, stats = load_player_matrix(csv_path)
+    labels = _group_labels(meta)
+    layout = _layout_digest(meta, labels)
+
+    index_path = os.path.join(directory, 'index.json')
+    old_columns = {}
+    if os.path.exists(index_path):
+        with open(index_path, encoding='utf-8') as f:
+            old_columns = json.load(f)['columns']
+
+    os.makedirs(directory, exist_ok=True)
+    columns, rebuilt = {}, []
+    for stat in stats.columns:
+        values = stats[stat].to_numpy(dtype=np.float64)
+        lower_is_better = is_negative_stat(stat)
+        column_hash = hashlib.sha1(values.tobytes() + layout.encode()
+                                   + bytes([lower_is_better, INDEX_VERSION])).hexdigest()
+        file_name = _stat_file(stat)
+        columns[stat] = {'hash': column_hash, 'file': file_name, 'lower_is_better': lower_is_better}
+        if (old_columns.get(stat, {}).get('hash') == column_hash
+                and os.path.exists(os.path.join(directory, file_name))):
+            continue
+        tmp_path = os.path.join(directory, file_name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, rank_column(values, labels, lower_is_better))
+        os.replace(tmp_path, os.path.join(directory, file_name))
+        rebuilt.append(stat)
+
+    for stat, entry in old_columns.items():
+        if stat not in columns and os.path.exists(os.path.join(directory, entry['file'])):
+            os.remove(os.path.join(directory, entry['file']))
+
+    index = {
+        'source': os.path.abspath(csv_path),
+        'source_mtime': os.path.getmtime(csv_path),
+        'layout': layout,
+        'players': meta['Player'].astype(str).tolist(),
+        'player_ids': [None if pd.isna(player_id) else int(player_id)
+                       for player_id in meta.get('Player_ID', pd.Series([None] * len(meta)))],
+        'groups': {grouping: labels[grouping].where(labels[grouping].notna(), None).tolist()
+                   for grouping in GROUPINGS},
+        'columns': columns,
+    }
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, index_path)
+    return rebuilt
+
+
+class RankIndex:
+    """Constant-time rank and percentile lookups from a built rank index.
+
+    Players are found through a dict (by Player_ID or by name) and every stat file is
+    memory-mapped on first use, so a lookup is a couple of array reads. A name or ID can
+    have several rows (a player who changed squads, or two players sharing a name); the
+    lookups return one result per row, and a squad narrows them down."""
+
+    def __init__(self, directory=RANK_DIR):
+        self.directory = directory
+        with open(os.path.join(directory, 'index.json'), encoding='utf-8') as f:
+            index = json.load(f)
+        self.players = index['players']
+        self.groups = index['groups']
+        self.columns = index['columns']
+        self._rows = {}
+        for row, name in enumerate(self.players):
+            self._rows.setdefault(name, []).append(row)
+        for row, player_id in enumerate(index['player_ids']):
+            if player_id is not None:
+                self._rows.setdefault(player_id, []).append(row)
+        self._arrays = {}
+        self._lock = threading.Lock()
+
+    def _array(self, stat):
+        if stat not in self._arrays:
+            if stat not in self.columns:
+                raise KeyError(f"Unknown statistic: {stat}")
+            with self._lock:
+                path = os.path.join(self.directory, self.columns[stat]['file'])
+                self._arrays.setdefault(stat, np.load(path, mmap_mode='r'))
+        return self._arrays[stat]
+
+    def rows(self, player, squad=None):
+        """Every row of a player given by Player_ID or exact name, optionally in one squad only"""
+        if isinstance(player, str) and player.isdigit():
+            player = int(player)
+        rows = [row for row in self._rows.get(player, [])
+                if squad is None or self.groups['squad'][row] == squad]
+        if not rows:
+            raise KeyError(f"Unknown player: {player}" if squad is None else f"Unknown player: {player} at {squad}")
+        return rows
+
+    def ranks(self, player, stat, grouping='overall', squad=None):
+        """rank() for every row of a player, one result per squad they played for"""
+        return [self._rank(row, stat, grouping) for row in self.rows(player, squad)]
+
+    def rank(self, player, stat, grouping='overall', squad=None):
+        """Rank, percentile and group size of a player in one stat, overall or within their group.
+
+        Raises ValueError when the player has several rows and no squad picks one of them."""
+        rows = self.rows(player, squad)
+        if len(rows) > 1:
+            squads = ', '.join(str(self.groups['squad'][row]) for row in rows)
+            raise ValueError(f"{player} has {len(rows)} rows ({squads}), pass a squad or use ranks()")
+        return self._rank(rows[0], stat, grouping)
+
+    def _rank(self, row, stat, grouping):
+        if grouping not in GROUPINGS:
+            raise KeyError(f"Unknown grouping: {grouping}")
+        planes = self._array(stat)[GROUPINGS.index(grouping), :, row]
+        result = {
+            'player': self.players[row],
+            'squad': self.groups['squad'][row],
+            'stat': stat,
+            'grouping': grouping,
+            'group': self.groups[grouping][row],
+            'lower_is_better': self.columns[stat].get('lower_is_better', False),
+        }
+        for plane, value in zip(PLANES, planes):
+            value = float(value)
+            if np.isnan(value):
+                value = None
+            elif plane in ('rank', 'of'):
+                value = int(value)
+            else:
+                value = round(value, 2)
+            result[plane] = value
+        return result
+
+
+def load_rank_index(csv_path=RESULTS_CSV, directory=RANK_DIR):
+    """The rank index of a results file, brought up to date first if the file changed"""
+    index_path = os.path.join(directory, 'index.json')
+    fresh = False
+    if os.path.exists(index_path):
+        with open(index_path, encoding='utf-8') as f:
+            index = json.load(f)
+        fresh = (index['source'], index['source_mtime']) == (os.path.abspath(csv_path), os.path.getmtime(csv_path))
+    if not fresh:
+        rebuilt = build_rank_index(csv_path, directory)
+        print(f"Rank index updated, {len(rebuilt)} statistics re-ranked")
+    return RankIndex(directory)
+
+
+class _RankHandler(http.server.BaseHTTPRequestHandler):
+    index = None
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == '/rank':
+                self._send(200, self.index.ranks(query['player'], query['stat'], query.get('grouping', 'overall'),
+                                                 query.get('squad')))
+            elif url.path == '/stats':
+                self._send(200, list(self.index.columns))
+            else:
+                self._send(404, {'error': f"Unknown endpoint {url.path}, use /rank or /stats"})
+        except KeyError as e:
+            self._send(404, {'error': str(e).strip('"\'')})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_rank_index(index, port=8765):
+    """Serve GET /rank?player=..&stat=..&grouping=..&squad=.. and GET /stats on localhost in a background thread.
+
+    /rank answers with a list, one entry for every row (squad) of the player."""
+    handler = type('RankHandler', (_RankHandler,), {'index': index})
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"Serving the rank index on http://127.0.0.1:{server.server_port}/rank")
+    return server
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server = serve_rank_index(load_rank_index(), port)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,109 @@
+import time
+import random
+from collections import namedtuple
+from urllib.parse import urlsplit
+from multiprocessing.util import Finalize
+
+from fbref_tables import TABLE_TYPES, prepare_table, scrape_table_fast, scrape_table_with_selenium, table_url
+from scraping import DriverPool, SharedHostRateLimiter, create_chrome_driver, response_cache, run_workers
+
+# One table to scrape; season None is the current season
+Target = namedtuple('Target', ['competition', 'season', 'table_type'])
+
+DEFAULT_SETTINGS = {
+    'base_url': "https://fbref.com",
+    'record_dir': None,
+    'page_timeout': 20,
+    'retries': 3,
+    'backoff': 5.0,  # seconds before the first retry, doubled on every further retry
+    'columns_to_keep': None,
+}
+
+
+def build_targets(competitions, seasons, table_types=TABLE_TYPES):
+    """Every (competition, season, table type) combination, grouped by league-season"""
+    return [Target(competition, season, table_type)
+            for competition in competitions
+            for season in seasons
+            for table_type in table_types]
+
+
+# State of each worker process, filled in by _init_worker
+_worker = {}
+
+
+def _init_worker(limiter, settings):
+    _worker['limiter'] = limiter
+    _worker['settings'] = settings
+    # Each worker starts at most one browser, and only if the HTML fast path fails
+    drivers = DriverPool(1, create_chrome_driver)
+    _worker['drivers'] = drivers
+    Finalize(None, drivers.close, exitpriority=10)
+
+
+def scrape_target(target):
+    """Scrape and prepare one table in a worker, retrying with exponential backoff"""
+    settings = _worker['settings']
+    limiter = _worker['limiter']
+    table_id = TABLE_TYPES[target.table_type]
+    url = table_url(settings['base_url'], *target)
+
+    # The standard table keeps all its columns, the minutes filter still needs them
+    keep = None if target.table_type == 'stats' else settings['columns_to_keep']
+
+    for attempt in range(settings['retries'] + 1):
+        if attempt:
+            delay = settings['backoff'] * 2 ** (attempt - 1) * random.uniform(1.0, 1.5)
+            print(f"Retrying {url} in {delay:.1f}s (attempt {attempt + 1})")
+            time.sleep(delay)
+
+        if response_cache.needs_network(url):
+            limiter.wait(url)
+        df = scrape_table_fast(url, table_id, settings['record_dir'])
+
+        if df is None and not response_cache.cache_only:
+            print(f"Falling back to the browser for {table_id}")
+            with _worker['drivers'].session() as driver:
+                # Wait for a request slot only once a browser is free, right before it loads the page
+                limiter.wait(url)
+                df = scrape_table_with_selenium(url, table_id, driver, settings['page_timeout'],
+                                                settings['record_dir'])
+
+        if df is not None:
+            return prepare_table(df, table_id, keep=keep)
+
+        if response_cache.cache_only:
+            # Retrying cannot help when the page is simply not cached
+            break
+
+    print(f"Giving up on {url}")
+    return None
+
+
+def run_targets(targets, on_partition, settings=None, workers=4, requests_per_second=1.0):
+    """Scrape all targets on a process pool (workers=1 scrapes them one by one in this process).
+
+    on_partition(competition, season, tables) is called with {table_type: df} as soon as
+    every table of a league-season is done, so finished partitions can be written and freed."""
+    settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+    hosts = {urlsplit(table_url(settings['base_url'], *target)).netloc for target in targets}
+    limiter = SharedHostRateLimiter(hosts, requests_per_second)
+
+    remaining = {}
+    for target in targets:
+        key = (target.competition, target.season)
+        remaining[key] = remaining.get(key, 0) + 1
+    partitions = {}
+
+    for target, future in run_workers(scrape_target, targets, workers, _init_worker, (limiter, settings)):
+        try:
+            df = future.result()
+        except Exception as e:
+            print(f"Error scraping {target}: {e}")
+            df = None
+
+        key = (target.competition, target.season)
+        partitions.setdefault(key, {})[target.table_type] = df
+        remaining[key] -= 1
+        if remaining[key] == 0:
+            on_partition(target.competition, target.season, partitions.pop(key))
@@ -0,0 +1,333 @@
+import os
+import re
+import gzip
+import json
+import time
+import hashlib
+import queue
+import threading
+import functools
+import multiprocessing
+import contextlib
+import http.server
+from urllib.parse import urlsplit
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+
+import requests
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from webdriver_manager.chrome import ChromeDriverManager
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+
+# Response cache shared by all scrapers. SCRAPE_CACHE_ONLY=1 never touches the network
+# and only replays what is already cached, which gives reproducible inputs.
+CACHE_DIR = os.environ.get(
+    "SCRAPE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".http_cache"))
+CACHE_ONLY = os.environ.get("SCRAPE_CACHE_ONLY") == "1"
+
+# Seconds a cached page is used without asking the server again, per host
+CACHE_TTL = {
+    "fbref.com": 6 * 3600,
+    "www.footballtransfers.com": 12 * 3600,
+}
+DEFAULT_CACHE_TTL = 3600
+
+
+def create_chrome_driver():
+    """Start one headless Chrome session"""
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920x1080")
+    chrome_options.add_argument(f"user-agent={USER_AGENT}")
+
+    service = Service(ChromeDriverManager().install())
+    return webdriver.Chrome(service=service, options=chrome_options)
+
+
+class ResponseCache:
+    """Gzipped page bodies on disk, keyed by URL, with the validators needed to revalidate them"""
+
+    def __init__(self, directory=CACHE_DIR, ttl=None, default_ttl=DEFAULT_CACHE_TTL, cache_only=CACHE_ONLY):
+        self.directory = directory
+        self.ttl = CACHE_TTL if ttl is None else ttl
+        self.default_ttl = default_ttl
+        self.cache_only = cache_only
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        folder = os.path.join(self.directory, key[:2])
+        return os.path.join(folder, key + '.html.gz'), os.path.join(folder, key + '.json')
+
+    def _write(self, path, data):
+        # Write to a temporary file first so a crash never leaves half an entry behind
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def load_meta(self, url):
+        try:
+            with open(self._paths(url)[1], encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load(self, url):
+        """Return (html, meta) for a cached URL, or (None, None)"""
+        meta = self.load_meta(url)
+        if meta is None:
+            return None, None
+        try:
+            with gzip.open(self._paths(url)[0], 'rt', encoding='utf-8') as f:
+                return f.read(), meta
+        except (OSError, ValueError):
+            return None, None
+
+    def is_fresh(self, url, meta):
+        ttl = self.ttl.get(urlsplit(url).netloc, self.default_ttl)
+        return time.time() - meta.get('fetched_at', 0) < ttl
+
+    def needs_network(self, url):
+        """True when fetching `url` would go to the server (used to skip rate limiting)"""
+        meta = self.load_meta(url)
+        return not self.cache_only and (meta is None or not self.is_fresh(url, meta))
+
+    def fresh_html(self, url):
+        """Cached HTML that needs no revalidation (any cached HTML in cache-only mode)"""
+        html, meta = self.load(url)
+        if html is not None and (self.cache_only or self.is_fresh(url, meta)):
+            return html
+        return None
+
+    def store(self, url, html, headers=None):
+        headers = headers or {}
+        meta = {
+            'url': url,
+            'fetched_at': time.time(),
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+        }
+        body_path, meta_path = self._paths(url)
+        self._write(body_path, gzip.compress(html.encode('utf-8')))
+        self._write(meta_path, json.dumps(meta).encode('utf-8'))
+
+    def touch(self, url, meta):
+        """Mark an entry as fresh again after the server answered 304 Not Modified"""
+        meta = dict(meta, fetched_at=time.time())
+        self._write(self._paths(url)[1], json.dumps(meta).encode('utf-8'))
+
+
+response_cache = ResponseCache()
+
+_thread_state = threading.local()
+
+
+def http_session():
+    """One requests.Session per thread, so worker threads can reuse connections safely"""
+    session = getattr(_thread_state, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers['User-Agent'] = USER_AGENT
+        _thread_state.session = session
+    return session
+
+
+def fetch_html(url, timeout=30, cache=response_cache):
+    """Download the raw HTML of a page without a browser, None on failure.
+
+    Fresh cache entries are returned without a request; stale ones are revalidated
+    with If-None-Match / If-Modified-Since."""
+    if cache is None:
+        cached_html, meta = None, None
+    else:
+        cached_html, meta = cache.load(url)
+        if cached_html is not None and (cache.cache_only or cache.is_fresh(url, meta)):
+            return cached_html
+        if cache.cache_only:
+            print(f"Not in cache (cache-only mode): {url}")
+            return None
+
+    headers = {}
+    if meta:
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    try:
+        response = http_session().get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached_html is not None:
+            cache.touch(url, meta)
+            return cached_html
+        response.raise_for_status()
+        if cache is not None:
+            cache.store(url, response.text, response.headers)
+        return response.text
+    except Exception as e:
+        print(f"Error downloading {url}: {e}")
+        if cached_html is not None:
+            print(f"Using the stale cached copy of {url}")
+        return cached_html
+
+
+def extract_table_html(html, table_id):
+    """Cut the <table id=table_id> element out of a page, None if it is not there.
+
+    fbref ships some tables inside HTML comments and only un-comments them with
+    JavaScript; a plain text search finds those as well."""
+    match = re.search(r'<table\b[^>]*\bid=["\']%s["\']' % re.escape(table_id), html)
+    if not match:
+        return None
+    end = html.find('</table>', match.end())
+    if end == -1:
+        return None
+    return html[match.start():end + len('</table>')]
+
+
+def wait_for_element(driver, by, value, timeout=20):
+    """Block until the element is present in the DOM and return it"""
+    return WebDriverWait(driver, timeout).until(EC.presence_of_element_located((by, value)))
+
+
+class SharedHostRateLimiter:
+    """Space out requests so each host sees at most `requests_per_second`, across worker processes.
+
+    Create it in the parent process and hand it to the workers through the pool
+    initializer; the hosts have to be known up front."""
+
+    def __init__(self, hosts, requests_per_second=1.0):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._lock = multiprocessing.Lock()
+        self._next_slot = {host: multiprocessing.Value('d', 0.0, lock=False) for host in hosts}
+
+    def wait(self, url):
+        next_slot = self._next_slot.get(urlsplit(url).netloc)
+        if next_slot is None:
+            return
+        with self._lock:
+            now = time.time()
+            slot = max(now, next_slot.value)
+            next_slot.value = slot + self.interval
+
+        delay = slot - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class DriverPool:
+    """Hand out at most `size` browser sessions to worker threads"""
+
+    def __init__(self, size, factory=create_chrome_driver):
+        self.size = max(1, size)
+        self.factory = factory
+        self._idle = queue.Queue()
+        self._drivers = []
+        self._reserved = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            # Reserve the slot before the (slow) browser startup
+            can_create = self._reserved < self.size
+            if can_create:
+                self._reserved += 1
+
+        if not can_create:
+            return self._idle.get()
+
+        try:
+            driver = self.factory()
+        except Exception:
+            with self._lock:
+                self._reserved -= 1
+            raise
+        with self._lock:
+            self._drivers.append(driver)
+        return driver
+
+    def release(self, driver):
+        self._idle.put(driver)
+
+    @contextlib.contextmanager
+    def session(self):
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self):
+        for driver in self._drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                print(f"Error closing browser: {e}")
+        self._drivers = []
+        self._reserved = 0
+
+
+def run_workers(func, items, workers=4, initializer=None, initargs=()):
+    """Apply `func` to every item in worker processes, yielding (item, future) as each finishes.
+
+    Workers keep their state (browser, rate limiter) in module globals set up by
+    `initializer`. With workers=1 everything runs in this process, in order."""
+    items = list(items)
+    if workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for item in items:
+            future = Future()
+            try:
+                future.set_result(func(item))
+            except Exception as e:
+                future.set_exception(e)
+            yield item, future
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        futures = {executor.submit(func, item): item for item in items}
+        for future in as_completed(futures):
+            yield futures[future], future
+
+
+# Recorded pages, so the scrapers can run offline against a local server.
+# Record with FBREF_RECORD_DIR=<dir>, then serve <dir> with serve_recorded_pages()
+# and point FBREF_BASE_URL at http://127.0.0.1:<port>.
+def recorded_page_path(directory, url):
+    path = urlsplit(url).path.strip('/')
+    return os.path.join(directory, *path.split('/'), 'index.html')
+
+
+def save_recorded_page(directory, url, html):
+    path = recorded_page_path(directory, url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+
+class _RecordedPageHandler(http.server.SimpleHTTPRequestHandler):
+    # Pages are recorded as UTF-8; without a charset clients would guess Latin-1
+    extensions_map = dict(http.server.SimpleHTTPRequestHandler.extensions_map,
+                          **{'.html': 'text/html; charset=utf-8'})
+
+
+def serve_recorded_pages(directory, port=8000):
+    """Serve a directory of recorded pages on localhost in a background thread"""
+    handler = functools.partial(_RecordedPageHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"Serving recorded pages from {directory} on http://127.0.0.1:{server.server_port}")
+    return server
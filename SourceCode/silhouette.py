@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+# Above this many rows 'auto' switches from the exact score to a stratified sample
+EXACT_LIMIT = 10000
+DEFAULT_SAMPLE_SIZE = 2000
+# Memory budget for one chunk of the distance matrix
+WORKING_MEMORY_MB = 64
+
+
+def _chunk_rows(n_columns, working_memory_mb=WORKING_MEMORY_MB):
+    return max(1, int(working_memory_mb * 2 ** 20 // (8 * max(n_columns, 1))))
+
+
+def _distances(rows, data, data_sq):
+    """Euclidean distances between a chunk of rows and every row of data"""
+    rows_sq = np.einsum('ij,ij->i', rows, rows)
+    squared = rows_sq[:, None] + data_sq[None, :] - 2.0 * rows @ data.T
+    return np.sqrt(np.maximum(squared, 0.0))
+
+
+def stratified_sample(labels, sample_size, random_state=0):
+    """Row indices of a sample that keeps the cluster proportions of labels.
+
+    Every cluster keeps at least two rows (or all of them, if it has fewer), so each
+    sampled point still has neighbours in its own cluster."""
+    labels = np.asarray(labels)
+    if sample_size >= len(labels):
+        return np.arange(len(labels))
+    rng = np.random.default_rng(random_state)
+    clusters, counts = np.unique(labels, return_counts=True)
+    quota = np.maximum(np.round(counts / len(labels) * sample_size).astype(int), np.minimum(counts, 2))
+    picked = [rng.choice(np.flatnonzero(labels == cluster), size=min(size, count), replace=False)
+              for cluster, count, size in zip(clusters, counts, quota)]
+    return np.sort(np.concatenate(picked))
+
+
+def silhouette_values(data, labels, rows=None, working_memory_mb=WORKING_MEMORY_MB):
+    """Silhouette of the given rows (all by default) against every point of data.
+
+    Distances are computed a chunk of rows at a time and summed per cluster right away,
+    so memory stays at about working_memory_mb whatever the number of rows. With all
+    rows this is the exact silhouette; with a sample, every sampled point is still scored
+    against the full data set. Points alone in their cluster score 0, as in scikit-learn."""
+    data = np.asarray(data, dtype=np.float64)
+    labels = np.asarray(labels)
+    rows = np.arange(len(data)) if rows is None else np.asarray(rows)
+    clusters, codes = np.unique(labels, return_inverse=True)
+    n_clusters = len(clusters)
+    counts = np.bincount(codes, minlength=n_clusters).astype(np.float64)
+    one_hot = np.zeros((len(data), n_clusters))
+    one_hot[np.arange(len(data)), codes] = 1.0
+    data_sq = np.einsum('ij,ij->i', data, data)
+
+    scores = np.zeros(len(rows))
+    step = _chunk_rows(len(data), working_memory_mb)
+    for start in range(0, len(rows), step):
+        chunk = rows[start:start + step]
+        sums = _distances(data[chunk], data, data_sq) @ one_hot  # (chunk, clusters)
+        own = codes[chunk]
+        own_size = counts[own]
+        with np.errstate(all='ignore'):
+            a = sums[np.arange(len(chunk)), own] / (own_size - 1)
+            mean_other = sums / counts
+        mean_other[np.arange(len(chunk)), own] = np.inf
+        b = mean_other.min(axis=1)
+        with np.errstate(all='ignore'):
+            s = (b - a) / np.maximum(a, b)
+        scores[start:start + len(chunk)] = np.where(own_size > 1, np.nan_to_num(s), 0.0)
+    return scores
+
+
+def simplified_silhouette(data, labels, centers, working_memory_mb=WORKING_MEMORY_MB):
+    """Centroid-based silhouette: distance to the own centroid against the nearest other one.
+
+    O(n * k) instead of O(n^2); labels index the rows of centers."""
+    data = np.asarray(data, dtype=np.float64)
+    centers = np.asarray(centers, dtype=np.float64)
+    labels = np.asarray(labels)
+    centers_sq = np.einsum('ij,ij->i', centers, centers)
+
+    scores = np.empty(len(data))
+    step = _chunk_rows(len(centers), working_memory_mb)
+    for start in range(0, len(data), step):
+        distances = _distances(data[start:start + step], centers, centers_sq)
+        own = labels[start:start + step]
+        a = distances[np.arange(len(own)), own]
+        distances[np.arange(len(own)), own] = np.inf
+        b = distances.min(axis=1)
+        with np.errstate(all='ignore'):
+            scores[start:start + len(own)] = np.nan_to_num((b - a) / np.maximum(a, b))
+    return float(scores.mean())
+
+
+def silhouette(data, labels, method='auto', sample_size=DEFAULT_SAMPLE_SIZE, centers=None, random_state=0):
+    """Silhouette score by one of several methods.
+
+    'exact' scores every point, 'sampled' a stratified sample of sample_size points
+    (each against all the data), 'simplified' uses the cluster centers, and 'auto' is
+    exact up to EXACT_LIMIT rows and sampled above."""
+    if len(np.unique(labels)) < 2:
+        return None
+    if method == 'auto':
+        method = 'exact' if len(data) <= EXACT_LIMIT else 'sampled'
+    if method == 'exact':
+        return float(silhouette_values(data, labels).mean())
+    if method == 'sampled':
+        rows = stratified_sample(labels, sample_size, random_state)
+        return float(silhouette_values(data, labels, rows).mean())
+    if method == 'simplified':
+        if centers is None:
+            raise ValueError("The simplified silhouette needs the cluster centers")
+        return simplified_silhouette(data, labels, centers)
+    raise ValueError(f"Unknown silhouette method: {method}")
+
+
+def approximation_report(data, labels, centers, sample_sizes=(100, 250, 500, 1000), repeats=5):
+    """How far the sampled and simplified scores are from the exact one, for small data sets"""
+    exact = silhouette(data, labels, 'exact')
+    rows = []
+    for sample_size in sample_sizes:
+        if sample_size >= len(data):
+            continue
+        scores = [silhouette(data, labels, 'sampled', sample_size, random_state=seed) for seed in range(repeats)]
+        rows.append({'Method': 'sampled', 'Sample_Size': sample_size, 'Score': np.mean(scores),
+                     'Spread': np.std(scores), 'Error': np.mean(np.abs(np.array(scores) - exact))})
+    simplified = silhouette(data, labels, 'simplified', centers=centers)
+    rows.append({'Method': 'simplified', 'Sample_Size': len(data), 'Score': simplified,
+                 'Spread': 0.0, 'Error': abs(simplified - exact)})
+    report = pd.DataFrame(rows)
+    report.insert(0, 'Exact', exact)
+    return report.round(4)
@@ -0,0 +1,177 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Polarity is 1 when more is better, -1 when less is better and 0 for descriptive stats;
+# weight is the default weight in composite ratings
+StatInfo = namedtuple('StatInfo', ['polarity', 'weight', 'category', 'per90'])
+
+CATEGORIES = ['general', 'attack', 'possession', 'defence', 'goalkeeping', 'discipline']
+
+# name: (polarity, category); per-90 stats are recognised by their name
+_STATS = {
+    'Age': (0, 'general'),
+    'Matches': (1, 'general'),
+    'Playing_Time_Starts': (1, 'general'),
+    'Minutes': (1, 'general'),
+
+    'Performance_Gls': (1, 'attack'),
+    'Performance_Ast': (1, 'attack'),
+    'Expected_xG': (1, 'attack'),
+    'Expected_xAG': (1, 'attack'),
+    'Per_90_Minutes_Gls': (1, 'attack'),
+    'Per_90_Minutes_Ast': (1, 'attack'),
+    'Per_90_Minutes_xG': (1, 'attack'),
+    'Per_90_Minutes_xAG': (1, 'attack'),
+    'Shots_On_Target_Percentage': (1, 'attack'),
+    'Shots_On_Target_Per90': (1, 'attack'),
+    'Goals_PerShot': (1, 'attack'),
+    'Shooting_Distance': (0, 'attack'),
+    'Keypasses': (1, 'attack'),
+    'Passes_Into_Penalty_Area': (1, 'attack'),
+    'Crossed_Into_Penalty_Area': (1, 'attack'),
+    'Shot_Creating_Actions': (1, 'attack'),
+    'Shot_Creating_Actions_Per90': (1, 'attack'),
+    'Goal_Creating_Actions': (1, 'attack'),
+    'Goal_Creating_Actions_Per90': (1, 'attack'),
+    'Touches_Att_Pen': (1, 'attack'),
+    'Carries_Into_Penalty_Area': (1, 'attack'),
+    'Crosses': (1, 'attack'),
+    'Offsides': (-1, 'attack'),
+
+    'Progression_PrgC': (1, 'possession'),
+    'Progression_PrgP': (1, 'possession'),
+    'Progression_PrgR': (1, 'possession'),
+    'Total_Passes_Completed': (1, 'possession'),
+    'Total_Passes_Completed_Percentage': (1, 'possession'),
+    'Total_Passing_Distance': (0, 'possession'),
+    'Short_Passe_Completed_Percentage': (1, 'possession'),
+    'Medium_Passes_Completed_Percentage': (1, 'possession'),
+    'Long_Passes_Completed_Percentage': (1, 'possession'),
+    'Passes_Into_Final_Third': (1, 'possession'),
+    'Progressive_Passes': (1, 'possession'),
+    'Touches': (1, 'possession'),
+    'Touches_Mid_3rd': (1, 'possession'),
+    'Touches_Att_3rd': (1, 'possession'),
+    'Take_Ons_Attempted': (1, 'possession'),
+    'Take_Ons_Success_Percentage': (1, 'possession'),
+    'Take_Ons_Tackled_Percentage': (-1, 'possession'),
+    'Carries': (1, 'possession'),
+    'Total_Carrying_Distance': (0, 'possession'),
+    'Progressive_Carrying_Distance': (1, 'possession'),
+    'Progressive_Carries': (1, 'possession'),
+    'Carries_Into_Final_Third': (1, 'possession'),
+    'Miscontrols': (-1, 'possession'),
+    'Dispossessions': (-1, 'possession'),
+    'Receiving': (1, 'possession'),
+    'Progressive_Receiving': (1, 'possession'),
+    'Fouled': (1, 'possession'),
+
+    'Tackles': (1, 'defence'),
+    'Tackles_Won': (1, 'defence'),
+    'Defensive_Actions_Attempted': (1, 'defence'),
+    'Defensive_Actions_Lost': (-1, 'defence'),
+    'Blocks': (1, 'defence'),
+    'Shots_Blocked': (1, 'defence'),
+    'Passes_Blocked': (1, 'defence'),
+    'Interceptions': (1, 'defence'),
+    'Touches_Defensive_Penalty_Area': (0, 'defence'),
+    'Touches_Def_3rd': (1, 'defence'),
+    'Recoveries': (1, 'defence'),
+    'Aerial_Duels_Won': (1, 'defence'),
+    'Aerial_Duels_Lost': (-1, 'defence'),
+    'Aerial_Duels_Wonpct': (1, 'defence'),
+
+    'Goals_Against_Per90': (-1, 'goalkeeping'),
+    'Save_Percentage': (1, 'goalkeeping'),
+    'CleanSheet_Percentage': (1, 'goalkeeping'),
+    'Penalty_Save_Percentage': (1, 'goalkeeping'),
+
+    'Yellow_Cards': (-1, 'discipline'),
+    'Red_Cards': (-1, 'discipline'),
+    'Fouls': (-1, 'discipline'),
+}
+
+
+def _is_per90(name):
+    lowered = name.lower()
+    return 'per90' in lowered or 'per_90' in lowered or lowered.endswith('_90')
+
+
+STAT_REGISTRY = {name: StatInfo(polarity, float(abs(polarity)), category, _is_per90(name))
+                 for name, (polarity, category) in _STATS.items()}
+
+# Case-insensitive lookup table
+_BY_LOWER_NAME = {name.lower(): info for name, info in STAT_REGISTRY.items()}
+
+UNKNOWN_STAT = StatInfo(0, 0.0, 'general', False)
+
+
+def stat_info(name):
+    """Metadata of a stat; unknown stats are neutral with weight 0"""
+    return _BY_LOWER_NAME.get(str(name).lower(), UNKNOWN_STAT)
+
+
+def is_positive_stat(name):
+    return stat_info(name).polarity > 0
+
+
+def is_negative_stat(name):
+    return stat_info(name).polarity < 0
+
+
+class RatingEngine:
+    """Composite team ratings: weighted sums of polarity-adjusted z-scores.
+
+    The groups x stats table of means is z-scored per stat once (missing values count
+    as average) and multiplied by the stat polarities, so every rating afterwards is a
+    single matrix-vector product. Passing a stats x schemes weight matrix rates every
+    weighting scheme at once."""
+
+    def __init__(self, means):
+        self.columns = [col for col in means.columns if stat_info(col).polarity != 0]
+        self.groups = means.index
+        values = means[self.columns].to_numpy(dtype=np.float64)
+        with np.errstate(all='ignore'):
+            mean = np.nanmean(values, axis=0)
+            std = np.nanstd(values, axis=0)
+        std[~(std > 0)] = 1.0
+        z = np.nan_to_num((values - mean) / std, nan=0.0)
+        self.polarity = np.array([stat_info(col).polarity for col in self.columns], dtype=np.float64)
+        self.z = np.ascontiguousarray(z * self.polarity)
+        self.default_weights = np.array([stat_info(col).weight for col in self.columns])
+        self._categories = np.array([stat_info(col).category for col in self.columns])
+        self._column_index = {col: i for i, col in enumerate(self.columns)}
+
+    def weights(self, overrides=None, categories=None, per90_only=False):
+        """Weight vector from the registry defaults.
+
+        categories maps a category to a multiplier ({'defence': 2, 'general': 0}),
+        overrides sets the weight of single stats and per90_only zeroes every stat
+        that is not a per-90 rate."""
+        weights = self.default_weights.copy()
+        for category, factor in (categories or {}).items():
+            weights[self._categories == category] *= factor
+        if per90_only:
+            weights *= np.array([stat_info(col).per90 for col in self.columns], dtype=np.float64)
+        for stat, weight in (overrides or {}).items():
+            if stat in self._column_index:
+                weights[self._column_index[stat]] = weight
+        return weights
+
+    def ratings(self, weights=None):
+        """Rating of every group, normalised by the total weight.
+
+        weights is a vector (or a dict/Series by stat) for one scheme, or a 2D array with
+        one column per scheme, which returns one rating column per scheme."""
+        if weights is None:
+            weights = self.default_weights
+        elif isinstance(weights, (dict, pd.Series)):
+            weights = self.weights(overrides=dict(weights), categories={category: 0 for category in CATEGORIES})
+        weights = np.asarray(weights, dtype=np.float64)
+        total = np.abs(weights).sum(axis=0)
+        scores = self.z @ weights / np.where(total > 0, total, 1.0)
+        if scores.ndim == 1:
+            return pd.Series(scores, index=self.groups, name='Rating')
+        return pd.DataFrame(scores, index=self.groups)
@@ -0,0 +1,126 @@
+import os
+import pickle
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+
+from player_data import iter_player_chunks
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(BASE_DIR, "streaming_kmeans.pkl")
+
+CHUNK_SIZE = 10000
+
+
+class StreamingKMeans:
+    """Mini-batch KMeans over standardized stats, fitted one chunk of players at a time.
+
+    The scaler keeps a running mean and variance (StandardScaler.partial_fit), missing
+    values are imputed with the running mean, and MiniBatchKMeans.partial_fit updates
+    the centers. When a new chunk moves the mean or variance, the centers are first
+    mapped back to raw units and re-scaled with the new parameters, so they keep
+    pointing at the same players. The whole object pickles, so fitting can resume later."""
+
+    def __init__(self, n_clusters=8, batch_size=1024, random_state=42):
+        self.n_clusters = n_clusters
+        self.scaler = StandardScaler()
+        self.model = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, random_state=random_state,
+                                     n_init=3)
+        self.columns = None
+        self.n_rows = 0
+        self.sources = {}  # source -> modification time it was folded in at
+        self._pending = []  # chunks held back until there are enough rows for the first update
+
+    @property
+    def fitted(self):
+        return hasattr(self.model, 'cluster_centers_')
+
+    def _align(self, stats):
+        if self.columns is None:
+            self.columns = list(stats.columns)
+        return stats.reindex(columns=self.columns).to_numpy(dtype=np.float64)
+
+    def transform(self, values):
+        """Standardize raw stat rows with the running scaler, missing values become 0 (the mean)"""
+        return np.nan_to_num(self.scaler.transform(np.asarray(values, dtype=np.float64)), nan=0.0)
+
+    def partial_fit(self, stats):
+        """Fold one chunk of players (a stats frame) into the scaler and the clusters"""
+        values = self._align(stats)
+        old_mean = old_scale = None
+        if hasattr(self.scaler, 'mean_'):
+            old_mean, old_scale = self.scaler.mean_.copy(), self.scaler.scale_.copy()
+        self.scaler.partial_fit(values)
+        self.n_rows += len(values)
+
+        if self.fitted and old_mean is not None:
+            raw_centers = self.model.cluster_centers_ * old_scale + old_mean
+            # Stats without any value so far have no mean yet; their centers stay at 0
+            self.model.cluster_centers_ = np.nan_to_num((raw_centers - self.scaler.mean_) / self.scaler.scale_)
+
+        # The first update needs at least one row per cluster
+        self._pending.append(values)
+        if not self.fitted and sum(len(chunk) for chunk in self._pending) < self.n_clusters:
+            return self
+        values = np.vstack(self._pending)
+        self._pending = []
+        self.model.partial_fit(self.transform(values))
+        return self
+
+    def predict(self, values, chunk_size=CHUNK_SIZE):
+        """Cluster of every raw stat row, a chunk at a time (works on memory-mapped arrays)"""
+        if not self.fitted:
+            raise ValueError(f"Only {self.n_rows} players folded in so far, the clusters need at least "
+                             f"{self.n_clusters} before they can assign any")
+        values = values.reindex(columns=self.columns).to_numpy() if hasattr(values, 'reindex') else values
+        return np.concatenate([self.model.predict(self.transform(values[start:start + chunk_size]))
+                               for start in range(0, len(values), chunk_size)] or [np.empty(0, dtype=int)])
+
+    def raw_centers(self):
+        """Cluster centers in the original stat units"""
+        return self.model.cluster_centers_ * self.scaler.scale_ + self.scaler.mean_
+
+    def save(self, path=STATE_PATH):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def fold_in(sources, state_path=STATE_PATH, n_clusters=8, chunk_size=CHUNK_SIZE):
+    """Resume the saved state (or start one) and fold in every results file not seen yet.
+
+    Files are read chunk_size rows at a time. Folding in only ever adds rows, so when a
+    file that was already folded in has changed, its old rows cannot be taken out again:
+    the state is then refitted from scratch over the given sources."""
+    state = None
+    if os.path.exists(state_path):
+        try:
+            state = StreamingKMeans.load(state_path)
+        except Exception as e:
+            print(f"Could not load {state_path}, starting over: {e}")
+    if state is not None:
+        changed = [path for path in sources
+                   if state.sources.get(os.path.abspath(path), os.path.getmtime(path)) != os.path.getmtime(path)]
+        if changed:
+            print(f"{', '.join(changed)} changed since it was folded in, refitting the streaming clusters")
+            state = None
+    if state is None or state.n_clusters != n_clusters:
+        state = StreamingKMeans(n_clusters=n_clusters)
+
+    for path in sources:
+        key, mtime = os.path.abspath(path), os.path.getmtime(path)
+        if state.sources.get(key) == mtime:
+            continue
+        for _, stats in iter_player_chunks(path, chunk_size):
+            state.partial_fit(stats)
+        state.sources[key] = mtime
+        print(f"Folded {path} into the streaming clusters ({state.n_rows} players so far)")
+        state.save(state_path)
+    return state
@@ -0,0 +1,333 @@
+import os
+import json
+import warnings
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(BASE_DIR, "streaming_stats.npz")
+
+ALL = 'All'
+DEFAULT_BINS = 256
+# Bump when the saved layout changes; older states are then rebuilt
+STATE_VERSION = 3
+
+
+def _player_keys(meta):
+    """Player_ID where there is one, the name otherwise"""
+    names = meta['Player'].astype(str)
+    if 'Player_ID' not in meta.columns:
+        return names.tolist()
+    ids = meta['Player_ID']
+    return [name if pd.isna(player_id) else int(player_id) for name, player_id in zip(names, ids)]
+
+
+class StreamingStats:
+    """Per-group, per-stat running statistics that can be updated row by row.
+
+    Every (group, stat) cell keeps its count, mean and sum of squared deviations
+    (Welford / Chan moments, which can be merged and un-merged exactly) and a
+    histogram used as a quantile sketch for the median, so medians are approximate to
+    within one bin width. The bins of a stat start out covering the range seen when the
+    state was created; a value outside them widens the range with some headroom and
+    re-bins that stat from the stored rows, so growing season totals never pile up in
+    the outer bins.
+
+    The last values of every row are kept as well, in a dict keyed by player, group
+    and the occurrence of that pair (a player who moved squads has a row in each), so
+    applying a changed row first takes its old values out and then adds the new ones.
+    The cost of apply() is proportional to the number of rows passed in, not to the
+    number of rows the state holds."""
+
+    def __init__(self, columns, edges, by='Squad'):
+        self.columns = list(columns)
+        self.edges = np.asarray(edges, dtype=np.float64)  # (stats, bins + 1)
+        self.by = by
+        self.groups = [ALL]
+        self._group_index = {ALL: 0}
+        n_stats, n_bins = len(self.columns), self.edges.shape[1] + 1
+        self.count = np.zeros((1, n_stats))
+        self.mean = np.zeros((1, n_stats))
+        self.m2 = np.zeros((1, n_stats))
+        self.hist = np.zeros((1, n_stats, n_bins), dtype=np.int64)
+        # Last applied values of every row, keyed by (player, group code, occurrence)
+        self.rows = {}
+
+    @classmethod
+    def from_frame(cls, meta, stats, by='Squad', bins=DEFAULT_BINS):
+        """A state holding every row of (meta, stats), with bin edges spanning the data"""
+        values = stats.to_numpy(dtype=np.float64)
+        with np.errstate(all='ignore'):
+            low = np.nan_to_num(np.nanmin(values, axis=0), nan=0.0) if len(values) else np.zeros(values.shape[1])
+            high = np.nan_to_num(np.nanmax(values, axis=0), nan=0.0) if len(values) else np.zeros(values.shape[1])
+        high = np.where(high > low, high, low + 1.0)
+        edges = low[:, None] + (high - low)[:, None] * np.linspace(0.0, 1.0, bins + 1)
+        state = cls(stats.columns, edges, by=by)
+        state.apply(meta, stats)
+        return state
+
+    def _group_codes(self, labels):
+        """Code of every group label, registering new groups; players without a group get -1"""
+        codes = np.empty(len(labels), dtype=int)
+        for i, label in enumerate(labels):
+            if label is None:
+                codes[i] = -1
+                continue
+            if label not in self._group_index:
+                self._group_index[label] = len(self.groups)
+                self.groups.append(label)
+            codes[i] = self._group_index[label]
+        grow = len(self.groups) - self.count.shape[0]
+        if grow > 0:
+            self.count = np.vstack([self.count, np.zeros((grow, len(self.columns)))])
+            self.mean = np.vstack([self.mean, np.zeros((grow, len(self.columns)))])
+            self.m2 = np.vstack([self.m2, np.zeros((grow, len(self.columns)))])
+            self.hist = np.concatenate([self.hist, np.zeros((grow,) + self.hist.shape[1:], dtype=np.int64)])
+        return codes
+
+    def _known_codes(self, labels):
+        """Like _group_codes without registering anything: unknown groups get -2"""
+        return np.array([-1 if label is None else self._group_index.get(label, -2) for label in labels], dtype=int)
+
+    def _labels(self, meta):
+        return meta[self.by].astype(object).where(meta[self.by].notna(), None).tolist()
+
+    @staticmethod
+    def _row_keys(meta, codes):
+        """(player, group code, occurrence) of every row; occurrence tells repeated pairs apart"""
+        seen, keys = {}, []
+        for player, code in zip(_player_keys(meta), codes.tolist()):
+            occurrence = seen.get((player, code), 0)
+            seen[(player, code)] = occurrence + 1
+            keys.append((player, code, occurrence))
+        return keys
+
+    @staticmethod
+    def _with_all(codes, values):
+        """Every row once for its group (when it has one) and once for 'All'"""
+        in_group = codes >= 0
+        return (np.concatenate([codes[in_group], np.zeros(len(codes), dtype=int)]),
+                np.vstack([values[in_group], values]))
+
+    def _add_to_histograms(self, codes, values, sign, stats=None):
+        """Count (sign=1) or uncount (sign=-1) rows in the histograms of the given stats (default all)"""
+        for stat in range(len(self.columns)) if stats is None else stats:
+            column = values[:, stat]
+            valid = ~np.isnan(column)
+            bins = np.searchsorted(self.edges[stat], column[valid], side='right')
+            np.add.at(self.hist[:, stat, :], (codes[valid], bins), sign)
+
+    def _widen(self, values):
+        """Re-bin the stats for which some of the values fall outside the bin edges"""
+        if len(values) == 0:
+            return
+        with np.errstate(all='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            low, high = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+        outside = np.flatnonzero((low < self.edges[:, 0]) | (high > self.edges[:, -1]))
+        if len(outside) == 0:
+            return
+        codes = np.array([key[1] for key in self.rows], dtype=int)
+        stored = np.array(list(self.rows.values())).reshape(len(codes), len(self.columns))
+        codes, stored = self._with_all(codes, stored)
+        for stat in outside:
+            start, stop = min(self.edges[stat, 0], low[stat]), max(self.edges[stat, -1], high[stat])
+            # Half the range again as headroom, so totals that keep growing re-bin rarely
+            headroom = (stop - start) / 2
+            start -= headroom if low[stat] < self.edges[stat, 0] else 0.0
+            stop += headroom if high[stat] > self.edges[stat, -1] else 0.0
+            self.edges[stat] = np.linspace(start, stop, self.edges.shape[1])
+            self.hist[:, stat, :] = 0
+        self._add_to_histograms(codes, stored, 1, outside)
+
+    def _update(self, codes, values, sign):
+        """Merge (sign=1) or un-merge (sign=-1) a batch of rows into their groups and 'All'"""
+        if len(codes) == 0:
+            return
+        codes, values = self._with_all(codes, values)
+        valid = ~np.isnan(values)
+        filled = np.where(valid, values, 0.0)
+        shape = self.count.shape
+
+        # Moments of the batch, per (group, stat)
+        batch_count = np.zeros(shape)
+        batch_sum = np.zeros(shape)
+        np.add.at(batch_count, codes, valid.astype(np.float64))
+        np.add.at(batch_sum, codes, filled)
+        with np.errstate(all='ignore'):
+            batch_mean = np.where(batch_count > 0, batch_sum / batch_count, 0.0)
+        batch_m2 = np.zeros(shape)
+        np.add.at(batch_m2, codes, np.where(valid, (filled - batch_mean[codes]) ** 2, 0.0))
+
+        with np.errstate(all='ignore'):
+            if sign > 0:
+                total = self.count + batch_count
+                delta = batch_mean - self.mean
+                mean = np.where(total > 0, self.mean + delta * batch_count / total, 0.0)
+                m2 = self.m2 + batch_m2 + np.where(total > 0, delta ** 2 * self.count * batch_count / total, 0.0)
+            else:
+                total = self.count - batch_count
+                mean = np.where(total > 0, (self.count * self.mean - batch_sum) / total, 0.0)
+                delta = batch_mean - mean
+                m2 = self.m2 - batch_m2 - np.where(total > 0, delta ** 2 * total * batch_count / self.count, 0.0)
+        touched = batch_count > 0
+        self.count = np.where(touched, total, self.count)
+        self.mean = np.where(touched, mean, self.mean)
+        # Un-merging can leave tiny negative rounding errors
+        self.m2 = np.where(touched, np.maximum(m2, 0.0), self.m2)
+        self.m2[self.count <= 1] = 0.0
+        self._add_to_histograms(codes, values, sign)
+
+    def _retract(self, keys):
+        """Take the rows with the given (player, group code, occurrence) keys out of the statistics"""
+        keys = [key for key in keys if key in self.rows]
+        if keys:
+            old = np.array([self.rows.pop(key) for key in keys])
+            self._update(np.array([key[1] for key in keys], dtype=int), old, -1)
+
+    def _insert(self, keys, codes, values):
+        self._retract(keys)
+        self._widen(values)
+        self._update(codes, values, 1)
+        self.rows.update(zip(keys, values))
+
+    def _changed(self, keys, values):
+        """Boolean mask of the keyed rows that are new or differ from the values last applied"""
+        missing = np.full(len(self.columns), np.nan)
+        old = np.array([self.rows.get(key, missing) for key in keys]).reshape(values.shape)
+        same = ((old == values) | (np.isnan(old) & np.isnan(values))).all(axis=1)
+        return ~(np.array([key in self.rows for key in keys], dtype=bool) & same)
+
+    def apply(self, meta, stats):
+        """Insert or replace the given player rows (new matchweek totals, corrections...).
+
+        Only these rows are looked up and updated, however many rows the state holds.
+        A player with several rows in one group has to be passed with all of them."""
+        codes = self._group_codes(self._labels(meta))
+        values = stats.reindex(columns=self.columns).to_numpy(dtype=np.float64)
+        self._insert(self._row_keys(meta, codes), codes, values)
+
+    def sync(self, meta, stats):
+        """Bring the state in line with a full snapshot of the data.
+
+        Rows that are new or changed are applied and rows that are no longer in the
+        snapshot are taken out, so applying the same snapshot again changes nothing.
+        Every row of the snapshot is looked up once; use apply() when only the changed
+        rows are at hand. Returns the number of (changed, removed) rows."""
+        codes = self._group_codes(self._labels(meta))
+        keys = self._row_keys(meta, codes)
+        values = stats.reindex(columns=self.columns).to_numpy(dtype=np.float64)
+        changed = self._changed(keys, values)
+        gone = self.rows.keys() - set(keys)
+        self._retract(gone)
+        self._insert([key for key, change in zip(keys, changed) if change], codes[changed], values[changed])
+        return int(changed.sum()), len(gone)
+
+    def remove(self, keys):
+        """Take players out of the statistics (every row of theirs), by Player_ID or name"""
+        players = set(keys)
+        self._retract([key for key in self.rows if key[0] in players])
+
+    def changed_rows(self, meta, stats):
+        """Boolean mask of the rows that are new or differ from the values last applied"""
+        values = stats.reindex(columns=self.columns).to_numpy(dtype=np.float64)
+        return self._changed(self._row_keys(meta, self._known_codes(self._labels(meta))), values)
+
+    def _order_statistics(self, position):
+        """Value at the given 0-based position of every (group, stat), from the histograms.
+
+        The values in a bin are taken as evenly spread over it, each in the middle of
+        its share, so a lone value is placed in the middle of its bin."""
+        hist = self.hist.astype(np.float64)
+        cumulative = np.cumsum(hist, axis=2)
+        index = np.minimum((cumulative <= position[:, :, None]).sum(axis=2), hist.shape[2] - 1)
+        in_bin = np.take_along_axis(hist, index[:, :, None], axis=2)[:, :, 0]
+        before = np.take_along_axis(cumulative, index[:, :, None], axis=2)[:, :, 0] - in_bin
+
+        # Bin i covers edges[i - 1]..edges[i]; the open-ended outer bins are clamped to the range
+        edges = self.edges
+        stat_index = np.arange(len(self.columns))[None, :]
+        lower = edges[stat_index, np.clip(index - 1, 0, edges.shape[1] - 1)]
+        upper = edges[stat_index, np.clip(index, 0, edges.shape[1] - 1)]
+        with np.errstate(all='ignore'):
+            fraction = np.where(in_bin > 0, (position - before + 0.5) / in_bin, 0.0)
+        return lower + (upper - lower) * np.clip(fraction, 0.0, 1.0)
+
+    def medians(self):
+        """Median of every (group, stat): the mean of the middle one or two values, as estimated
+        from the histograms, so within one bin width of the exact median"""
+        middle = (self.count - 1) / 2.0
+        median = (self._order_statistics(np.floor(middle)) + self._order_statistics(np.ceil(middle))) / 2.0
+        return np.where(self.count > 0, median, np.nan)
+
+    def stds(self):
+        with np.errstate(all='ignore'):
+            std = np.sqrt(self.m2 / (self.count - 1))
+        std[self.count == 1] = 0.0
+        return np.where(self.count > 0, std, np.nan)
+
+    def means(self, include_all=False):
+        """Groups x stats frame of the running means"""
+        means = pd.DataFrame(np.where(self.count > 0, self.mean, np.nan), index=self.groups, columns=self.columns)
+        return means if include_all else means.drop(index=ALL)
+
+    def summary(self, decimals=2):
+        """The results2.csv layout (see team_stats.grouped_stats) from the running state"""
+        order = [0] + sorted(range(1, len(self.groups)), key=lambda code: str(self.groups[code]))
+        order = [code for code in order if code == 0 or self.count[code].sum() > 0]
+        parts = {'Median': self.medians(), 'Mean': np.where(self.count > 0, self.mean, np.nan), 'Std': self.stds()}
+        table = pd.DataFrame({f'{label} of {col}': np.round(parts[label][order, i], decimals)
+                              for i, col in enumerate(self.columns) for label in ('Median', 'Mean', 'Std')})
+        table.insert(0, '  ', [self.groups[code] for code in order])
+        table.insert(0, ' ', np.arange(1, len(order) + 1))
+        return table
+
+    def save(self, path=STATE_PATH):
+        players = [player if isinstance(player, str) else int(player) for player, _, _ in self.rows]
+        info = {'version': STATE_VERSION, 'columns': self.columns, 'by': self.by, 'groups': self.groups,
+                'players': players}
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, info=np.array(json.dumps(info, ensure_ascii=False)), edges=self.edges,
+                     count=self.count, mean=self.mean, m2=self.m2, hist=self.hist,
+                     row_groups=np.array([group for _, group, _ in self.rows], dtype=int),
+                     row_occurrences=np.array([occurrence for _, _, occurrence in self.rows], dtype=int),
+                     row_values=np.array(list(self.rows.values())).reshape(len(self.rows), len(self.columns)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        with np.load(path) as data:
+            info = json.loads(str(data['info']))
+            if info.get('version') != STATE_VERSION:
+                raise ValueError(f"state version {info.get('version')} instead of {STATE_VERSION}")
+            state = cls(info['columns'], data['edges'], by=info['by'])
+            state.groups = info['groups']
+            state._group_index = {group: code for code, group in enumerate(state.groups)}
+            state.count, state.mean, state.m2, state.hist = data['count'], data['mean'], data['m2'], data['hist']
+            keys = zip(info['players'], data['row_groups'].tolist(), data['row_occurrences'].tolist())
+            state.rows = dict(zip(keys, data['row_values']))
+        return state
+
+
+def update_state(meta, stats, path=STATE_PATH, by='Squad'):
+    """Load the saved state, bring it in line with (meta, stats), and save it.
+
+    Only the rows that changed since the last run are applied and rows that are gone
+    are taken out. Starts a fresh state when there is none yet or it was built for
+    other columns."""
+    state = None
+    if os.path.exists(path):
+        try:
+            state = StreamingStats.load(path)
+        except Exception as e:
+            print(f"Could not load {path}, starting over: {e}")
+    if state is None or state.columns != list(stats.columns) or state.by != by:
+        state = StreamingStats.from_frame(meta, stats, by=by)
+        print(f"Streaming statistics started with {len(stats)} players")
+    else:
+        changed, removed = state.sync(meta, stats)
+        print(f"Streaming statistics updated with {changed} changed and {removed} removed rows")
+    state.save(path)
+    return state
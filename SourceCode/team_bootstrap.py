@@ -0,0 +1,122 @@
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from player_data import RESULTS_CSV, load_player_matrix
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_CSV = os.path.join(BASE_DIR, "team_bootstrap.csv")
+
+# Data of each worker process, filled in by _init_worker
+_worker = {}
+
+
+def _init_worker(values, team_rows):
+    _worker['values'] = values
+    _worker['team_rows'] = team_rows
+
+
+def _resample_batch(seed, size):
+    """Means and medians of every (team, stat) for `size` resamples, and how often each team led.
+
+    Players are resampled with replacement within their own team: one (size, team size)
+    matrix of row indices per team gathers all resamples of the batch at once."""
+    values, team_rows = _worker['values'], _worker['team_rows']
+    rng = np.random.default_rng(seed)
+    n_teams, n_stats = len(team_rows), values.shape[1]
+    means = np.full((size, n_teams, n_stats), np.nan, dtype=np.float32)
+    medians = np.full((size, n_teams, n_stats), np.nan, dtype=np.float32)
+
+    # All-NaN resamples give NaN without the 'Mean of empty slice' warnings
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        for team, rows in enumerate(team_rows):
+            picks = rows[rng.integers(0, len(rows), size=(size, len(rows)))]
+            sample = values[picks]  # (size, team size, stats)
+            means[:, team] = np.nanmean(sample, axis=1)
+            medians[:, team] = np.nanmedian(sample, axis=1)
+
+    # Leader of every stat in every resample; stats no team has a value for have no leader
+    ranked = np.where(np.isnan(means), -np.inf, means)
+    leader = ranked.argmax(axis=1)
+    has_value = ~np.isnan(means).all(axis=1)
+    leads = np.zeros((n_teams, n_stats), dtype=np.int64)
+    for team in range(n_teams):
+        leads[team] = ((leader == team) & has_value).sum(axis=0)
+    return means, medians, leads
+
+
+def bootstrap_teams(meta, stats, by='Squad', n_resamples=10000, batch_size=250, workers=None,
+                    confidence=0.95, seed=0):
+    """Bootstrap confidence intervals of every (team, stat) mean and median.
+
+    Resamples are split in batches that run on a process pool (workers=1 runs them
+    in this process); every batch has its own seed derived from `seed`, so the result
+    does not depend on the number of workers. Returns one row per (team, stat) with the
+    point estimates, the interval bounds and Lead_Frequency, the share of resamples in
+    which the team had the highest mean."""
+    labels = meta[by].astype(object)
+    teams = sorted(labels.dropna().unique().tolist())
+    team_rows = [np.flatnonzero((labels == team).to_numpy()) for team in teams]
+    values = stats.to_numpy(dtype=np.float32)
+
+    sizes = [min(batch_size, n_resamples - start) for start in range(0, n_resamples, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(values, team_rows)
+        results = [_resample_batch(s, size) for s, size in zip(seeds, sizes)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(values, team_rows)) as executor:
+            results = list(executor.map(_resample_batch, seeds, sizes))
+
+    means = np.concatenate([result[0] for result in results])
+    medians = np.concatenate([result[1] for result in results])
+    leads = sum(result[2] for result in results)
+
+    tail = (1 - confidence) / 2 * 100
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        mean_low, mean_high = np.nanpercentile(means, [tail, 100 - tail], axis=0)
+        median_low, median_high = np.nanpercentile(medians, [tail, 100 - tail], axis=0)
+
+    grouped = stats.groupby(labels.to_numpy(), sort=True)
+    point_mean = grouped.mean().reindex(teams).to_numpy()
+    point_median = grouped.median().reindex(teams).to_numpy()
+
+    n_teams, n_stats = len(teams), stats.shape[1]
+    result = pd.DataFrame({
+        'Team': np.repeat(teams, n_stats),
+        'Statistic': np.tile(stats.columns, n_teams),
+        'Mean': point_mean.ravel(),
+        'Mean_Low': mean_low.ravel(),
+        'Mean_High': mean_high.ravel(),
+        'Median': point_median.ravel(),
+        'Median_Low': median_low.ravel(),
+        'Median_High': median_high.ravel(),
+        'Lead_Frequency': (leads / max(n_resamples, 1)).ravel(),
+    })
+    return result.round(3)
+
+
+def lead_summary(result):
+    """Per stat: the team with the highest mean and how often it actually led in the resamples"""
+    best = result.loc[result.dropna(subset=['Mean']).groupby('Statistic', sort=False)['Mean'].idxmax()]
+    return best[['Statistic', 'Team', 'Mean', 'Mean_Low', 'Mean_High', 'Lead_Frequency']].reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    meta, stats = load_player_matrix(RESULTS_CSV)
+    result = bootstrap_teams(meta, stats.drop(columns=['Age'], errors='ignore'))
+    result.to_csv(OUTPUT_CSV, index=False, encoding='utf-8-sig')
+    print(f"Bootstrap intervals saved to '{OUTPUT_CSV}'")
+
+    summary = lead_summary(result)
+    shaky = summary[summary['Lead_Frequency'] < 0.5]
+    print(f"\n{len(shaky)} of {len(summary)} best-team picks lead in fewer than half of the resamples:")
+    print(shaky.to_string(index=False))
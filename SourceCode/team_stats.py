@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+AGGREGATES = [('median', 'Median'), ('mean', 'Mean'), ('std', 'Std')]
+
+
+def _summaries(grouped, counts):
+    """Median, mean and std of every column in one grouped aggregation; std is 0 for a single value"""
+    table = grouped.agg([func for func, _ in AGGREGATES])
+    std_columns = [(col, 'std') for col in counts.columns]
+    single = counts.to_numpy() == 1
+    table[std_columns] = table[std_columns].mask(single, 0.0)
+    return table
+
+
+def grouped_stats(meta, stats, by='Squad', include_all=True, decimals=2):
+    """The results2.csv table: median, mean and std of every stat for every group.
+
+    by is a meta column ('Squad', 'Position', 'Nation', 'League', ...) or a list of them,
+    in which case the group label joins the values with ' | '. Groups are sorted, the
+    "All" row over every player comes first when include_all is set, and the columns are
+    ' ' (row number), '  ' (group) and then Median/Mean/Std of every stat in order."""
+    by = [by] if isinstance(by, str) else list(by)
+    keys = [meta[col].astype(object).to_numpy() for col in by]
+    keys = keys[0] if len(keys) == 1 else keys
+
+    grouped = stats.groupby(keys, sort=True, dropna=True)
+    table = _summaries(grouped, grouped.count())
+    if len(by) > 1:
+        table.index = [' | '.join(map(str, key)) for key in table.index]
+
+    if include_all:
+        overall = _summaries(stats.groupby(np.zeros(len(stats), dtype=int)), stats.count().to_frame().T)
+        overall.index = ['All']
+        table = pd.concat([overall, table])
+
+    table = table.round(decimals)
+    table.columns = [f'{label} of {col}' for col, func in table.columns
+                     for agg, label in AGGREGATES if agg == func]
+    # Row number and group columns joined in front in one go, inserting them fragments the frame
+    index_columns = pd.DataFrame({' ': np.arange(1, len(table) + 1), '  ': table.index}, index=table.index)
+    return pd.concat([index_columns, table], axis=1).reset_index(drop=True)
+
+
+def team_means(meta, stats, by='Squad'):
+    """Groups x stats table of means from one grouped mean over the whole stat matrix.
+
+    by works like in grouped_stats: 'Squad', 'Position', 'League', or a list such as
+    ['League', 'Squad'], which gives a MultiIndex."""
+    by = [by] if isinstance(by, str) else list(by)
+    keys = [meta[col].astype(object).to_numpy() for col in by]
+    means = stats.groupby(keys[0] if len(keys) == 1 else keys, sort=True).mean()
+    means.index.names = by
+    return means
+
+
+def dense_ranks(means, within=None):
+    """Dense rank of every group in every stat, 1 = highest mean.
+
+    within names an index level (for example 'League') to rank inside instead of overall."""
+    if within is None:
+        return means.rank(method='dense', ascending=False)
+    return means.groupby(level=within).rank(method='dense', ascending=False)
+
+
+def team_rankings(means):
+    """Best team, runner-up and the gap between them for every stat of a means table.
+
+    Ties go to the first group in index order, like idxmax; stats without any value are left out."""
+    values = means.to_numpy(dtype=np.float64)
+    order = np.argsort(np.where(np.isnan(values), np.inf, -values), axis=0, kind='stable')
+    stat_index = np.arange(values.shape[1])
+    best, runner_up = order[0], order[1] if len(order) > 1 else np.full(values.shape[1], -1)
+
+    best_value = values[best, stat_index]
+    runner_up_value = np.where(runner_up >= 0, values[runner_up, stat_index], np.nan)
+    # One slot per group plus None for a missing runner-up; filled in place so tuple labels stay whole
+    labels = np.empty(len(means.index) + 1, dtype=object)
+    labels[:-1] = means.index.tolist()
+    rankings = pd.DataFrame({
+        'Statistic': means.columns,
+        'Team': labels[best],
+        'Value': best_value,
+        'Runner_Up': labels[runner_up],
+        'Runner_Up_Value': runner_up_value,
+        'Gap': best_value - runner_up_value,
+    })
+    return rankings[~np.isnan(best_value)].reset_index(drop=True)
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+# The scripts import their sibling modules directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraping
+
+
+@pytest.fixture
+def empty_cache(tmp_path, monkeypatch):
+    """Point the shared response cache at an empty directory, so every page is fetched"""
+    monkeypatch.setattr(scraping.response_cache, 'directory', str(tmp_path / 'http_cache'))
+    monkeypatch.setattr(scraping.response_cache, 'cache_only', False)
+    return scraping.response_cache
+
+
+@pytest.fixture
+def serve_pages():
+    """serve_recorded_pages on a free port; returns the base URL and stops the server afterwards"""
+    servers = []
+
+    def serve(directory):
+        server = scraping.serve_recorded_pages(str(directory), port=0)
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
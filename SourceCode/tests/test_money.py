@@ -0,0 +1,34 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from money import format_money, parse_money
+
+
+def test_parse_money_units_and_currencies():
+    parsed = parse_money(['€17.7M', '€850K', '£1.2bn', '$10M', '25 EUR', '€1,500,000'])
+
+    np.testing.assert_allclose(parsed, [17.7, 0.85, 1.2e3 * 1.17, 10 * 0.92, 25e-6, 1.5])
+
+
+def test_parse_money_without_a_unit_is_missing():
+    parsed = parse_money(['17.7', '€17.7M', '17.7M', None, 'n/a'])
+
+    assert parsed.isna().tolist() == [True, False, False, True, True]
+    assert parsed[2] == pytest.approx(17.7)
+
+
+def test_parse_money_does_not_warn_on_values_without_currency():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        parse_money(['17.7M', '850K'])
+
+
+def test_format_money_uses_k_below_a_million():
+    formatted = format_money([17.7, 0.85, 0.0125, np.nan])
+
+    assert formatted.tolist()[:3] == ['€17.7M', '€850K', '€12.5K']
+    assert formatted.isna().tolist()[3]
+    assert format_money([0.85], suffix='K').tolist() == ['€850K']
+    assert format_money(parse_money(['€850K', '€66.5M'])).tolist() == ['€850K', '€66.5M']
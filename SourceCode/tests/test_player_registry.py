@@ -0,0 +1,58 @@
+from datetime import date
+
+import pandas as pd
+
+from player_registry import PlayerRegistry, birth_years
+
+SCRAPED_ON = date(2025, 5, 1)
+
+
+def stamp(registry, rows, source='fbref'):
+    df = pd.DataFrame(rows, columns=['Player', 'Squad', 'Age'])
+    return registry.stamp(df, source, reference_date=SCRAPED_ON)
+
+
+def test_birth_years():
+    years = birth_years(['25-100', '25-150', '31', None], reference_date=SCRAPED_ON)
+
+    assert years.tolist()[:2] == [2000, 1999]
+    assert years[2:].isna().all()
+
+
+def test_namesakes_get_their_own_ids(tmp_path):
+    registry = PlayerRegistry(str(tmp_path / 'registry.json'))
+
+    ids = stamp(registry, [('Danilo', 'Nott\'ham Forest', '24-010'), ('Danilo', 'Juventus', '33-300')])['Player_ID']
+
+    assert ids[0] != ids[1]
+    # Without a birth year the name alone cannot tell them apart
+    assert registry.resolve(['Danilo'], 'fbref').isna().all()
+
+
+def test_transferred_player_keeps_one_id_across_squads_and_runs(tmp_path):
+    path = str(tmp_path / 'registry.json')
+    registry = PlayerRegistry(path)
+    rows = [('Marcus Rashford', 'Manchester Utd', '27-187'), ('Marcus Rashford', 'Aston Villa', '27-187')]
+
+    first = stamp(registry, rows)['Player_ID']
+    registry.save()
+    again = stamp(PlayerRegistry(path), rows)['Player_ID']
+
+    assert first[0] == first[1]
+    assert again.tolist() == first.tolist()
+
+
+def test_fuzzy_matches_are_suggestions_until_confirmed(tmp_path):
+    registry = PlayerRegistry(str(tmp_path / 'registry.json'))
+    known = stamp(registry, [('Gabriel Martinelli', 'Arsenal', '23-340')])['Player_ID'][0]
+
+    provisional = stamp(registry, [('Gabriel Martinellii', 'Arsenal', '23-340')], source='other')['Player_ID'][0]
+
+    assert provisional != known
+    pending = registry.pending_suggestions()
+    assert pending[['Name', 'Player_ID']].values.tolist() == [['Gabriel Martinellii', known]]
+
+    assert registry.confirm('Gabriel Martinellii', 'other') == known
+    assert registry.lookup('Gabriel Martinellii') == known
+    assert provisional not in registry.players
+    assert registry.pending_suggestions().empty
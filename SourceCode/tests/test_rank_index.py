@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rank_index import RankIndex, build_rank_index
+
+
+@pytest.fixture
+def index(tmp_path):
+    # Rashford moved mid-season, so he has a row for each squad
+    csv_path = tmp_path / 'results.csv'
+    pd.DataFrame({
+        'Player': ['Marcus Rashford', 'Marcus Rashford', 'Ollie Watkins', 'Bruno Fernandes'],
+        'Squad': ['Manchester Utd', 'Aston Villa', 'Aston Villa', 'Manchester Utd'],
+        'Position': ['FW', 'FW', 'FW', 'MF'],
+        'Minutes': [1000, 800, 2500, 3000],
+        'Performance_Gls': [4, 2, 16, 'N/a'],
+    }).to_csv(csv_path, index=False)
+    build_rank_index(str(csv_path), str(tmp_path / 'rank_index'))
+    return RankIndex(str(tmp_path / 'rank_index'))
+
+
+def test_a_transferred_player_is_ranked_for_every_squad(index):
+    ranks = index.ranks('Marcus Rashford', 'Performance_Gls', 'squad')
+
+    assert [(r['squad'], r['value'], r['rank'], r['of']) for r in ranks] == [
+        ('Manchester Utd', 4.0, 1, 1), ('Aston Villa', 2.0, 2, 2)]
+    assert index.rank('Marcus Rashford', 'Performance_Gls', squad='Aston Villa')['rank'] == 3
+    with pytest.raises(ValueError, match='2 rows'):
+        index.rank('Marcus Rashford', 'Performance_Gls')
+
+
+def test_unknown_players_raise_key_error(index):
+    with pytest.raises(KeyError, match='Unknown player'):
+        index.rows('Marcus Rashfrod')
+    with pytest.raises(KeyError, match='Unknown player'):
+        index.rows('Ollie Watkins', squad='Manchester Utd')
+
+
+def test_values_keep_float64_precision(index):
+    assert index._array('Minutes').dtype == np.float64
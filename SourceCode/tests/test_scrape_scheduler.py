@@ -0,0 +1,98 @@
+import contextlib
+
+import pytest
+
+import scrape_scheduler
+from fbref_tables import TABLE_TYPES, table_url
+from scraping import SharedHostRateLimiter, save_recorded_page
+from scrape_scheduler import DEFAULT_SETTINGS, Target, build_targets, run_targets, scrape_target
+
+PLAYERS = [('Bukayo Saka', 'Arsenal', 2790), ('Martin Ødegaard', 'Arsenal', 2245), ('Jarrod Bowen', 'West Ham', 2871)]
+
+
+def stats_page(table_id):
+    rows = ''.join(f'<tr><th>{rank}</th><td>{player}</td><td>{squad}</td><td>{minutes}</td></tr>'
+                   for rank, (player, squad, minutes) in enumerate(PLAYERS, start=1))
+    return (f'<html><body><table id="{table_id}"><thead><tr><th>Rk</th><th>Player</th><th>Squad</th>'
+            f'<th>Min</th></tr></thead><tbody>{rows}</tbody></table></body></html>')
+
+
+@pytest.fixture
+def recorded_site(tmp_path, empty_cache, serve_pages):
+    """Every stat page of the current Premier League season, served from a local directory"""
+    record_dir = tmp_path / 'recorded'
+    for table_type, table_id in TABLE_TYPES.items():
+        save_recorded_page(str(record_dir), table_url('https://fbref.com', 9, None, table_type),
+                           stats_page(table_id))
+    return serve_pages(record_dir)
+
+
+# Rate limiter that never waits (it knows no hosts)
+NO_LIMIT = SharedHostRateLimiter(set(), 0)
+
+
+def settings_for(base_url, **overrides):
+    return dict(DEFAULT_SETTINGS, base_url=base_url, retries=0, **overrides)
+
+
+def test_scrape_target_reads_recorded_page(recorded_site):
+    scrape_scheduler._init_worker(NO_LIMIT, settings_for(recorded_site))
+
+    df = scrape_target(Target(9, None, 'stats'))
+
+    assert df['Player'].tolist() == [player for player, _, _ in PLAYERS]
+    assert df['Squad'].tolist() == [squad for _, squad, _ in PLAYERS]
+    assert df['Min'].tolist() == [minutes for _, _, minutes in PLAYERS]
+
+
+def test_recorded_pages_replay(recorded_site, tmp_path, empty_cache, serve_pages):
+    # Record what the first server returns, then scrape the recording
+    settings = settings_for(recorded_site, record_dir=str(tmp_path / 'again'))
+    scrape_scheduler._init_worker(NO_LIMIT, settings)
+    first = scrape_target(Target(9, None, 'stats'))
+
+    empty_cache.directory = str(tmp_path / 'http_cache_replay')
+    scrape_scheduler._init_worker(NO_LIMIT, settings_for(serve_pages(tmp_path / 'again')))
+    second = scrape_target(Target(9, None, 'stats'))
+
+    assert second.equals(first)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_run_targets_delivers_every_table_of_a_partition(recorded_site, workers):
+    partitions = []
+
+    run_targets(build_targets([9], [None]), lambda *partition: partitions.append(partition),
+                settings=settings_for(recorded_site), workers=workers, requests_per_second=0)
+
+    assert len(partitions) == 1
+    competition, season, tables = partitions[0]
+    assert (competition, season) == (9, None)
+    assert set(tables) == set(TABLE_TYPES)
+    assert all(df is not None and len(df) == len(PLAYERS) for df in tables.values())
+
+
+def test_browser_fallback_waits_for_the_rate_limit_after_acquiring_a_driver(empty_cache, monkeypatch):
+    events = []
+
+    class RecordingLimiter:
+        def wait(self, url):
+            events.append('wait')
+
+    class RecordingPool:
+        @contextlib.contextmanager
+        def session(self):
+            events.append('acquire')
+            yield 'driver'
+
+    def scrape_with_browser(url, table_id, driver, timeout, record_dir):
+        events.append('get')
+        return None
+
+    monkeypatch.setattr(scrape_scheduler, 'scrape_table_fast', lambda url, table_id, record_dir: None)
+    monkeypatch.setattr(scrape_scheduler, 'scrape_table_with_selenium', scrape_with_browser)
+    scrape_scheduler._init_worker(RecordingLimiter(), settings_for('http://127.0.0.1:9'))
+    monkeypatch.setitem(scrape_scheduler._worker, 'drivers', RecordingPool())
+
+    assert scrape_target(Target(9, None, 'stats')) is None
+    assert events == ['wait', 'acquire', 'wait', 'get']
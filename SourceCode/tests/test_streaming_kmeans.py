@@ -0,0 +1,37 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from streaming_kmeans import StreamingKMeans, fold_in
+
+
+def write_results(path, n_players, seed=0):
+    rng = np.random.default_rng(seed)
+    pd.DataFrame({
+        'Player': [f'Player {i}' for i in range(n_players)],
+        'Squad': 'Arsenal',
+        'Minutes': rng.integers(90, 3000, n_players),
+        'Goals': rng.integers(0, 20, n_players),
+    }).to_csv(path, index=False)
+
+
+def test_a_changed_file_replaces_its_old_rows(tmp_path):
+    csv_path, state_path = str(tmp_path / 'results.csv'), str(tmp_path / 'state.pkl')
+    write_results(csv_path, 30)
+    assert fold_in([csv_path], state_path, n_clusters=3).n_rows == 30
+
+    # Unchanged files are skipped, a rewritten one is not added on top of its old rows
+    assert fold_in([csv_path], state_path, n_clusters=3).n_rows == 30
+    write_results(csv_path, 20, seed=1)
+    os.utime(csv_path, (0, os.path.getmtime(csv_path) + 10))
+    assert fold_in([csv_path], state_path, n_clusters=3).n_rows == 20
+
+
+def test_predict_needs_a_row_per_cluster():
+    stats = pd.DataFrame({'Minutes': [90.0, 900.0], 'Goals': [0.0, 3.0]})
+    state = StreamingKMeans(n_clusters=3).partial_fit(stats)
+
+    with pytest.raises(ValueError, match='at least 3'):
+        state.predict(stats)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from streaming_stats import StreamingStats, update_state
+from team_stats import grouped_stats
+
+# Rashford moved mid-season, so he has a row for each squad
+ROWS = [
+    ('Marcus Rashford', 'Manchester Utd', 1000.0, 4.0),
+    ('Marcus Rashford', 'Aston Villa', 800.0, 2.0),
+    ('Ollie Watkins', 'Aston Villa', 2500.0, 16.0),
+    ('Bruno Fernandes', 'Manchester Utd', 3000.0, np.nan),
+    ('Cole Palmer', 'Chelsea', 2900.0, 15.0),
+]
+
+
+def snapshot(rows):
+    df = pd.DataFrame(rows, columns=['Player', 'Squad', 'Minutes', 'Goals'])
+    return df[['Player', 'Squad']], df[['Minutes', 'Goals']]
+
+
+def moments(table):
+    table = table.set_index('  ')
+    return table[[col for col in table.columns if not col.startswith('Median')]]
+
+
+def test_sync_matches_a_fresh_aggregation(tmp_path):
+    path = str(tmp_path / 'state.npz')
+    # An earlier run: other minutes, a player who has left since, no Palmer yet
+    earlier = [(player, squad, minutes / 2, goals) for player, squad, minutes, goals in ROWS[:4]]
+    update_state(*snapshot(earlier + [('Jadon Sancho', 'Chelsea', 700.0, 1.0)]), path=path)
+
+    meta, stats = snapshot(ROWS)
+    state = update_state(meta, stats, path=path)
+
+    pd.testing.assert_frame_equal(moments(state.summary()), moments(grouped_stats(meta, stats)))
+
+
+def test_applying_the_same_snapshot_again_changes_nothing(tmp_path):
+    path = str(tmp_path / 'state.npz')
+    meta, stats = snapshot(ROWS)
+    first = update_state(meta, stats, path=path).summary()
+
+    state = StreamingStats.load(path)
+    assert state.sync(meta, stats) == (0, 0)
+    pd.testing.assert_frame_equal(state.summary(), first)
+    pd.testing.assert_frame_equal(update_state(meta, stats, path=path).summary(), first)
+
+
+def test_medians_follow_totals_that_grow_past_the_first_range():
+    rng = np.random.default_rng(0)
+    meta = pd.DataFrame({'Player': [f'Player {i}' for i in range(200)], 'Squad': rng.choice(list('ABCDE'), 200)})
+    season = pd.DataFrame({'Minutes': rng.uniform(0, 3400, 200), 'Goals': rng.poisson(4, 200).astype(float)})
+
+    # Cumulative totals after every matchweek, the first week sets the initial bins
+    state = StreamingStats.from_frame(meta, season / 38)
+    for week in range(2, 39):
+        state.apply(meta, season * week / 38)
+
+    exact = season.groupby(meta['Squad']).median()
+    medians = pd.DataFrame(state.medians()[1:], index=state.groups[1:], columns=state.columns).sort_index()
+    bin_width = np.diff(state.edges, axis=1).max(axis=1)
+    assert ((medians - exact).abs() <= bin_width).all().all()
+
+
+def test_remove_takes_out_every_row_of_a_player():
+    meta, stats = snapshot(ROWS)
+    state = StreamingStats.from_frame(meta, stats)
+
+    state.remove(['Marcus Rashford'])
+
+    rest = ~meta['Player'].eq('Marcus Rashford').to_numpy()
+    pd.testing.assert_frame_equal(moments(state.summary()), moments(grouped_stats(meta[rest], stats[rest])))
@@ -0,0 +1,105 @@
+import importlib
+import json
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import ProblemIV
+from scraping import save_recorded_page
+
+# (player cell text, value) per page, as footballtransfers shows them
+PAGES = {
+    1: [('Erling Haaland\nMan City', '€200M'), ('Bukayo Saka\nArsenal', '€140.5M')],
+    2: [('Cole Palmer\nChelsea', '€130M'), ('Jarrod Bowen\nWest Ham', '€850K')],
+}
+
+
+def valuation_page(rows):
+    body = ''.join(f'<tr><td>{rank}</td><td></td>'
+                   f'<td class="player-name">{name.replace(chr(10), "<br>")}</td><td></td><td></td>'
+                   f'<td class="player-value">{value}</td></tr>'
+                   for rank, (name, value) in enumerate(rows, start=1))
+    # Placeholder rows are rendered before the data arrives and have to be skipped
+    body += '<tr class="table-placeholder"><td colspan="6"></td></tr>'
+    links = ''.join(f'<a href="/us/values/players/most-valuable-soccer-players/playing-in-uk-premier-league/{n}">'
+                    f'{n}</a>' for n in PAGES)
+    return (f'<html><body><table class="table table--player-valuations"><tbody>{body}</tbody></table>'
+            f'<nav>{links}</nav></body></html>')
+
+
+def test_parse_valuation_rows():
+    players, etvs = ProblemIV.parse_valuation_rows(valuation_page(PAGES[1]))
+
+    assert players == [name for name, _ in PAGES[1]]
+    assert etvs == [value for _, value in PAGES[1]]
+
+
+def test_detect_total_pages():
+    assert ProblemIV.detect_total_pages(valuation_page(PAGES[1])) == len(PAGES)
+    assert ProblemIV.detect_total_pages('<html></html>') is None
+
+
+@pytest.fixture
+def recorded_valuations(tmp_path, monkeypatch, empty_cache, serve_pages):
+    """ProblemIV reloaded with ETV_BASE_URL pointing at a local server of recorded pages"""
+    record_dir = tmp_path / 'recorded'
+    for page, rows in PAGES.items():
+        save_recorded_page(str(record_dir), ProblemIV.VALUATION_URL.format(page=page), valuation_page(rows))
+
+    monkeypatch.setenv('ETV_BASE_URL', serve_pages(record_dir))
+    monkeypatch.delenv('ETV_RECORD_DIR', raising=False)
+    yield importlib.reload(ProblemIV)
+    monkeypatch.undo()
+    importlib.reload(ProblemIV)
+
+
+@pytest.mark.parametrize('parallel_pages', [1, 2])
+def test_scrape_all_pages_from_recorded_pages(recorded_valuations, tmp_path, parallel_pages):
+    checkpoint_dir = tmp_path / 'checkpoints'
+
+    scraped = recorded_valuations.scrape_all_pages(checkpoint_dir=str(checkpoint_dir),
+                                                   parallel_pages=parallel_pages)
+
+    expected = [row for page in sorted(PAGES) for row in PAGES[page]]
+    assert list(scraped.columns) == ['Player', 'ETV']
+    assert scraped['Player'].tolist() == [name for name, _ in expected]
+    assert scraped['ETV'].tolist() == [value for _, value in expected]
+    # Every page was scraped, so the checkpoints are gone
+    assert not os.path.exists(checkpoint_dir)
+
+
+def test_checkpoints_of_an_expired_run_are_scraped_again(recorded_valuations, tmp_path):
+    checkpoint_dir = str(tmp_path / 'checkpoints')
+    run_id = recorded_valuations.start_run(checkpoint_dir)
+    recorded_valuations.save_checkpoint(checkpoint_dir, 2, ['Stale Player'], ['€1M'], 2, run_id)
+    assert list(recorded_valuations.load_checkpoints(checkpoint_dir, run_id)) == [2]
+
+    # The run started two days ago, longer than the checkpoints are kept
+    run_path = os.path.join(checkpoint_dir, 'run.json')
+    with open(run_path, encoding='utf-8') as f:
+        run = json.load(f)
+    run['started_at'] = time.time() - 48 * 3600
+    with open(run_path, 'w', encoding='utf-8') as f:
+        json.dump(run, f)
+
+    scraped = recorded_valuations.scrape_all_pages(checkpoint_dir=checkpoint_dir, parallel_pages=1)
+
+    assert 'Stale Player' not in scraped['Player'].tolist()
+    assert scraped['Player'].tolist() == [name for page in sorted(PAGES) for name, _ in PAGES[page]]
+
+
+def test_merge_gives_every_scraped_row_to_one_player_at_most():
+    local = pd.DataFrame({'Player': ['Erling Haaland', 'Erling Haalandd', 'Bukayo Sakaa', 'Bukayo Sakka'],
+                          'Player_ID': pd.array([None] * 4, dtype='Int64')})
+    local['Clean_Name'] = local['Player'].apply(ProblemIV.clean_player_name)
+    scraped = pd.DataFrame({'Player': ['Erling Haaland', 'Bukayo Saka'], 'ETV': ['€200M', '€140.5M']})
+
+    merged = ProblemIV.merge_data(local, scraped)
+
+    etv = dict(zip(merged['Player'], merged['ETV']))
+    assert etv['Erling Haaland'] == '€200M'
+    # The exact match keeps its row, and only one of the two misspellings gets Saka's
+    assert pd.isna(etv['Erling Haalandd'])
+    assert sorted(merged['ETV'].dropna()) == ['€140.5M', '€200M']